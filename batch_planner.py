@@ -0,0 +1,118 @@
+import io
+import contextlib
+import os
+import random
+import time
+
+import instrumentation
+import plan_history
+import seeding
+import tag_level_suggestion
+import task_enrichment
+from task_level_suggestion import WeekDistribution, save_distribution_to_csv
+import task_store
+
+# Task pools of the worker process: tasks-dir -> TaskPool. Built once per worker from the task DBs loaded by the parent
+# (or from the path of the task store, see task_store.open_task_pool).
+_task_pools = {}
+
+
+def _init_worker(task_dbs, profile=False):
+    # profile - the parent records --profile stages, the worker records its plans for run_batch to merge
+    if profile:
+        instrumentation.enable()
+        instrumentation.reset()
+    _task_pools.clear()
+    for tasks_dir, tasks_db in task_dbs.items():
+        _task_pools[tasks_dir] = task_store.open_task_pool(tasks_db)
+
+
+def generate_plan(task_pool, cfg, start_date, output_file, seed, verbose=False, weeks=1, split_by_week=False, enrichment=None,
+                  history=None):
+    # Non interactive version of the tag level and the task level stages: generate and save a plan of weeks weeks
+    # enrichment - task_enrichment.EnrichmentSettings to answer the task prompts of the plan
+    # history - plan_history.HistorySettings: avoid the recent tasks and record the plan in the stash-dir history
+    plan_history.apply_history(task_pool, cfg, start_date, history)
+    files, distribution = _generate_plan(task_pool, cfg, start_date, output_file, seed, verbose, weeks, split_by_week,
+                                         enrichment)
+    plan_history.record_plan(cfg, distribution, files, seed, history)
+    return files
+
+
+def _generate_plan(task_pool, cfg, start_date, output_file, seed, verbose, weeks, split_by_week, enrichment):
+    # Returns the saved files and the distribution
+    tag_rng, task_rng = seeding.make_stage_rngs(seed)
+    schedules = [tag_level_suggestion.generate_schedule(cfg, tag_rng) for _ in range(weeks)]
+    weekly_schedule, tag_counts, _ = tag_level_suggestion.merge_schedules(schedules)
+    week_dist = WeekDistribution(cfg, weekly_schedule, start_date, verbose, task_rng)
+    if verbose:
+        week_dist.distribute_tasks(task_pool, tag_counts)
+    else:
+        # "Can't find task" and "Extending ..." notes of every plan are just noise in batch mode
+        with contextlib.redirect_stdout(io.StringIO()):
+            week_dist.distribute_tasks(task_pool, tag_counts)
+    distribution = week_dist.get_distribution()
+    answers = task_enrichment.enrich_distribution(distribution, enrichment) if enrichment else None
+    files = save_distribution_to_csv(distribution, cfg.permanent_tasks, output_file, seed, split_by_week, answers)
+    return files, distribution
+
+
+def _run_plan(plan):
+    # recent_weights - plan_history.get_recent_weights() of the plan, read by the parent before the batch
+    cfg, start_date, output_file, seed, verbose, weeks, split_by_week, enrichment, recent_weights = plan
+    task_pool = _task_pools[cfg.tasks_dir]
+    task_pool.set_weight_factors(recent_weights)
+    files, distribution = _generate_plan(task_pool, cfg, start_date, output_file, seed, verbose, weeks, split_by_week,
+                                         enrichment)
+    return files, plan_history.get_plan_rows(distribution)
+
+
+def _run_worker_plan(plan):
+    # _run_plan in a worker process, with the instrumentation report of the plan (None without --profile)
+    instrumentation.reset()
+    output_files, plan_rows = _run_plan(plan)
+    return output_files, plan_rows, instrumentation.get_report() if instrumentation.enabled else None
+
+
+def get_batch_output_file(output_dir, cfg_path, start_date, several_configs):
+    file_name = f"{start_date}-week-plan.csv"
+    if several_configs:
+        cfg_name = os.path.splitext(os.path.basename(cfg_path))[0]
+        file_name = f"{cfg_name}-{file_name}"
+    return os.path.join(output_dir, file_name)
+
+
+def run_batch(plans, task_dbs, jobs, seed, verbose, weeks=1, split_by_week=False, enrichment=None, history=None):
+    # plans: list of (cfg, start date, output file); task_dbs: tasks-dir -> loaded tasks or task store path
+    # Every worker process receives the loaded task DBs once (pool initializer), not once per plan.
+    # Every plan gets its own seed derived from the batch seed, so the result doesn't depend on the worker count.
+    # For the same reason the plan history is read for all the plans before the batch and the plans are recorded
+    # after it: the plans of a batch don't avoid each other's tasks.
+    start = time.perf_counter()
+    jobs = min(jobs, len(plans))
+    seeds = random.Random(seed)
+    work = [(cfg, start_date, output_file, seeds.randrange(2**32), verbose, weeks, split_by_week, enrichment,
+             plan_history.get_recent_weights(cfg, start_date, history))
+            for cfg, start_date, output_file in plans]
+    results = []
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(task_dbs, instrumentation.enabled)) as executor:
+            for output_files, plan_rows, report in executor.map(_run_worker_plan, work):
+                if report is not None:
+                    instrumentation.merge_report(report)
+                results.append((output_files, plan_rows))
+                for output_file in output_files:
+                    print(f"Saved plan to {output_file}")
+    else:
+        _init_worker(task_dbs)
+        for plan in work:
+            output_files, plan_rows = _run_plan(plan)
+            results.append((output_files, plan_rows))
+            for output_file in output_files:
+                print(f"Saved plan to {output_file}")
+    plan_history.record_plans([(plan[0], output_files, plan[3], plan_rows)
+                               for plan, (output_files, plan_rows) in zip(work, results)], history)
+    elapsed = time.perf_counter() - start
+    print(f"Generated {len(plans)} plans in {elapsed:.2f}s ({len(plans) / elapsed:.1f} plans/s, {jobs} worker(s))")
@@ -0,0 +1,85 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import task_loader  # noqa: E402
+from generate_backlog import write_backlog  # noqa: E402
+
+
+# Loader as it was before the single pass pipeline: validate the whole file with csv.reader,
+# then parse it again with csv.DictReader and check every key of every row.
+def legacy_is_valid_csv_file(file_path):
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
+            csvreader = csv.reader(csvfile, delimiter=';')
+            headers = next(csvreader)
+            for row_number, row in enumerate(csvreader, start=2):
+                if len(row) != len(headers):
+                    return False
+                if not row[0] in task_loader.available_tags:
+                    pass
+                if not (row[1] and isinstance(row[0], str)):
+                    pass
+                if not (row[3] and row[3].replace('.', '', 1).isdigit() and float(row[3]) >= 0):
+                    pass
+                if not row[4]:
+                    pass
+            return True
+    except Exception:
+        return False
+
+
+def legacy_load_csv_files_from_directory(tasks_dir):
+    all_data = []
+    for file_name in os.listdir(tasks_dir):
+        if file_name.endswith('.csv'):
+            file_path = os.path.join(tasks_dir, file_name)
+            if not legacy_is_valid_csv_file(file_path):
+                continue
+            with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
+                csvreader = csv.DictReader(csvfile, delimiter=';')
+                for row in csvreader:
+                    row['file'] = file_name
+                    for key in task_loader.TASK_FIELDS:
+                        if not key in row:
+                            print(f"Error: '{key}' key not found in row of file {file_name}: {row}")
+                    all_data.append(row)
+    return all_data
+
+
+def measure(loader, tasks_dir, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loader(tasks_dir)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rows per second of the legacy and the single pass task loader")
+    parser.add_argument("--rows", type=int, default=50000, help="Total number of rows in the synthetic backlog")
+    parser.add_argument("--files", type=int, default=20, help="Number of csv files the rows are spread over")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tasks_dir:
+        write_backlog(tasks_dir, args.rows, args.files)
+        rows = args.rows
+
+        legacy = measure(legacy_load_csv_files_from_directory, tasks_dir, args.repeat)
+        single_pass = measure(lambda d: task_loader.load_tasks_directory(d), tasks_dir, args.repeat)
+
+    print(f"rows: {rows}, files: {args.files}")
+    print(f"legacy loader:      {legacy:.3f}s  {rows / legacy:,.0f} rows/s")
+    print(f"single pass loader: {single_pass:.3f}s  {rows / single_pass:,.0f} rows/s")
+    print(f"speedup: {legacy / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import csv
+import gc
+import io
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import task_loader  # noqa: E402
+from generate_backlog import generate_rows  # noqa: E402
+
+
+def make_backlog_text(rows):
+    text = io.StringIO(newline='')
+    writer = csv.writer(text, delimiter=';')
+    writer.writerow(task_loader.TASK_FIELDS)
+    writer.writerows(generate_rows(rows, random.Random(0)))
+    return text.getvalue()
+
+
+# Rows as they were loaded before the Task records: csv.DictReader dicts of strings plus the 'file' key
+def load_dict_rows(text, file_name):
+    rows = []
+    for row in csv.DictReader(io.StringIO(text, newline=''), delimiter=';'):
+        row['file'] = file_name
+        rows.append(row)
+    return rows
+
+
+def load_task_records(text, file_name):
+    return task_loader.parse_tasks(io.StringIO(text, newline=''), file_name)[0]
+
+
+def measure(loader, text):
+    gc.collect()
+    tracemalloc.start()
+    records = loader(text, "bench.csv")
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(records), current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory held by dict rows and Task records of a synthetic backlog")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of rows in the synthetic backlog")
+    args = parser.parse_args()
+
+    text = make_backlog_text(args.rows)
+    dict_count, dict_bytes = measure(load_dict_rows, text)
+    task_count, task_bytes = measure(load_task_records, text)
+
+    print(f"rows: {args.rows}")
+    print(f"dict rows:    {dict_bytes / 2**20:7.1f} MiB  {dict_bytes / dict_count:6.0f} bytes/row")
+    print(f"Task records: {task_bytes / 2**20:7.1f} MiB  {task_bytes / task_count:6.0f} bytes/row")
+    print(f"ratio: {dict_bytes / task_bytes:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import csv
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import task_loader  # noqa: E402
+
+DEFAULT_DAYS = ['1', '1', '1-2', '2-3', '2-4', '3-5']
+
+
+def parse_tag_mix(value):
+    # 'DEV=3,ENT=1' -> {'DEV': 3.0, 'ENT': 1.0}; empty -> every available tag with the same weight
+    if not value:
+        return {tag: 1.0 for tag in task_loader.available_tags}
+    tag_mix = {}
+    for item in value.split(','):
+        tag, _, weight = item.partition('=')
+        tag_mix[tag.strip()] = float(weight) if weight else 1.0
+    return tag_mix
+
+
+def generate_rows(rows, rng, tag_mix=None, days=DEFAULT_DAYS, priority_skew=1.0, prefix="task"):
+    # Rows in the tag;task;description;pickup-priority;days;remarks;prompt format.
+    # priority_skew > 1 makes most priorities small (a few favourites), < 1 makes them close to 1.
+    tag_mix = tag_mix or parse_tag_mix(None)
+    tags = list(tag_mix)
+    weights = list(tag_mix.values())
+    for row_index in range(rows):
+        yield [
+            rng.choices(tags, weights=weights)[0],
+            f"{prefix}-{row_index}",
+            f"synthetic task {row_index} description",
+            f"{rng.random() ** priority_skew:.3f}",
+            rng.choice(days),
+            "",
+            f"tell me about synthetic task {row_index}" if row_index % 4 == 0 else "",
+        ]
+
+
+def write_backlog(tasks_dir, rows, files=10, tag_mix=None, days=DEFAULT_DAYS, priority_skew=1.0, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(tasks_dir, exist_ok=True)
+    for file_index in range(files):
+        file_rows = rows // files + (1 if file_index < rows % files else 0)
+        file_path = os.path.join(tasks_dir, f"synthetic-{file_index:03}.csv")
+        with open(file_path, mode='w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerow(task_loader.TASK_FIELDS)
+            writer.writerows(generate_rows(file_rows, rng, tag_mix, days, priority_skew, f"task-{file_index}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic tasks directory")
+    parser.add_argument("tasks_dir", help="Directory to write the csv files to")
+    parser.add_argument("--rows", type=int, default=10000, help="Total number of tasks")
+    parser.add_argument("--files", type=int, default=10, help="Number of csv files the tasks are spread over")
+    parser.add_argument("--tag-mix", help="Tag weights, e.g. DEV=3,ENT=1,TODO=2. All tags equally by default")
+    parser.add_argument("--days", default=",".join(DEFAULT_DAYS), help="Comma separated days values to pick from, e.g. 1,1-2,2-4")
+    parser.add_argument("--priority-skew", type=float, default=1.0, help="Exponent applied to uniform priorities")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator")
+    args = parser.parse_args()
+
+    write_backlog(args.tasks_dir, args.rows, args.files, parse_tag_mix(args.tag_mix), args.days.split(','),
+                  args.priority_skew, args.seed)
+    print(f"Generated {args.rows} tasks in {args.files} files in {args.tasks_dir}")
+
+
+if __name__ == "__main__":
+    main()
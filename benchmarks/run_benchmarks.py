@@ -0,0 +1,123 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import tag_level_suggestion  # noqa: E402
+import task_level_suggestion  # noqa: E402
+import week_organizer_main  # noqa: E402
+from generate_backlog import write_backlog  # noqa: E402
+from task_pool import TaskPool  # noqa: E402
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def measure(function, repeat, number=1):
+    # Best time of repeat runs, per call of function
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_size(rows, cfg, repeat, work_dir):
+    tasks_dir = os.path.join(work_dir, f"tasks-{rows}")
+    write_backlog(tasks_dir, rows)
+    rng = random.Random(rows)
+    results = {}
+
+    results["load_csv_files_from_directory"] = measure(
+        lambda: week_organizer_main.load_csv_files_from_directory(tasks_dir, False, False), repeat)
+    tasks_db = week_organizer_main.load_csv_files_from_directory(tasks_dir, False, False)
+
+    results["generate_schedule"] = measure(lambda: tag_level_suggestion.generate_schedule(cfg, rng), repeat, 100)
+
+    weekly_schedule, tag_counts, tag_ranges = tag_level_suggestion.generate_schedule(cfg, rng)
+    day_counts = tag_level_suggestion.build_day_counts(weekly_schedule, cfg)
+
+    def adjust():
+        tag_level_suggestion.adjust_schedule(weekly_schedule, tag_counts, tag_ranges, cfg, rng.random() < 0.5, rng, day_counts)
+    results["adjust_schedule"] = measure(adjust, repeat, 100)
+
+    task_pool = TaskPool(tasks_db)
+    week_dist = task_level_suggestion.WeekDistribution(cfg, weekly_schedule, "03-Jun-2024", False, rng)
+    results["WeekDistribution.distribute_tasks"] = measure(lambda: week_dist.distribute_tasks(task_pool, tag_counts), repeat, 20)
+
+    output_file = os.path.join(work_dir, "week-plan.csv")
+    distribution = week_dist.get_distribution()
+    results["save_distribution_to_csv"] = measure(
+        lambda: task_level_suggestion.save_distribution_to_csv(distribution, cfg.permanent_tasks, output_file), repeat, 20)
+
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(report, baseline=None):
+    previous = {}
+    if baseline:
+        previous = {(r["rows"], r["benchmark"]): r["seconds"] for r in baseline["results"]}
+    for result in report["results"]:
+        line = f"{result['rows']:>8} rows  {result['benchmark']:<36} {result['seconds'] * 1000:10.3f} ms"
+        old = previous.get((result["rows"], result["benchmark"]))
+        if old:
+            line += f"  ({result['seconds'] / old:.2f}x of {baseline.get('commit') or 'baseline'})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the planner stages on synthetic backlogs and write the results as JSON")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma separated backlog sizes (rows)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per benchmark, the best one is reported")
+    parser.add_argument("--cfg", default=os.path.join(ROOT_DIR, "task-configuration.json"), help="Configuration file")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    cfg = week_organizer_main.load_configuration(args.cfg)
+
+    report = {
+        "commit": get_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in (int(size) for size in args.sizes.split(',')):
+            for benchmark, seconds in run_size(rows, cfg, args.repeat, work_dir).items():
+                report["results"].append({"rows": rows, "benchmark": benchmark, "seconds": seconds})
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+    print_results(report, baseline)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
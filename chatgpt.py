@@ -1,39 +1,46 @@
 from openai import OpenAI
+from llm_cache import LlmCache
+from task_enrichment import DEFAULT_CACHE_PATH, SYSTEM_MESSAGE, get_sampling_params, make_settings
 
 # features:
 # - summarize the week
 # - generate remarks for the tasks (starting points, hints)
 
-# Function to read API key from a file
-def read_api_key(file_path):
-    with open(file_path, 'r') as file:
-        return file.read().strip()
-
-# Function to get response from ChatGPT API
-def get_chatgpt_response(prompt, api_key):
-        
-    client = OpenAI( api_key=api_key )
-
+# Function to get response from ChatGPT API. Create the client once and reuse it for all the prompts
+# (see task_enrichment.py for the concurrent version used by week_organizer_main.py --enrich)
+# settings - task_enrichment.EnrichmentSettings: model and sampling parameters are the ones of --enrich, so both
+# share the cached answers
+# cache - optional llm_cache.LlmCache, a cached answer is returned without a request
+def get_chatgpt_response(prompt, client, settings, cache=None):
+    params = get_sampling_params(settings)
+    key = None
+    if cache is not None:
+        key = cache.make_key(settings.model, SYSTEM_MESSAGE, prompt, params)
+        answer = cache.get(key)
+        if answer is not None:
+            return answer
 
     try:
         chat_completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",  # Use the appropriate model
+            model=settings.model,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant. You provide short and precise information."},
+                {"role": "system", "content": SYSTEM_MESSAGE},
                 {"role": "user", "content": prompt},
             ],
-            max_tokens=150,  # Adjust the number of tokens as needed
-            n=1,
-            stop=None,
-            temperature=0.7,  # Adjust the temperature for more creative (higher) or deterministic (lower) responses
+            **params,
         )
-        return chat_completion.choices[0].message['content'].strip()
+        answer = (chat_completion.choices[0].message.content or "").strip()
     except Exception as e:
         return f"An error occurred: {str(e)}"
+    if cache is not None:
+        cache.put(key, answer)
+    return answer
 
 def main():
     # Read API key from file
-    api_key = read_api_key('chatgpt-api-key.txt')
+    settings = make_settings(api_key_file='chatgpt-api-key.txt')
+    client = OpenAI(api_key=settings.api_key, base_url=settings.base_url)
+    cache = LlmCache(DEFAULT_CACHE_PATH)
     
     # Array of hardcoded prompts
     prompts = [
@@ -46,9 +53,11 @@ def main():
     
     # Get and print responses for each prompt
     for idx, prompt in enumerate(prompts, start=1):
-        response = get_chatgpt_response(prompt, api_key)
+        response = get_chatgpt_response(prompt, client, settings, cache)
         print(f"Prompt {idx}: {prompt}")
         print(f"Response {idx}: {response}\n")
+    print(cache.get_stats_line())
+    cache.close()
 
 if __name__ == "__main__":
     main()
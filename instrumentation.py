@@ -0,0 +1,117 @@
+import cProfile
+import functools
+import json
+import time
+
+# Lightweight per-stage timing and counters for --profile.
+# Everything is a no-op until enable() is called: stage() returns a shared null context manager,
+# count() returns immediately and timed() functions call straight through.
+# Batch workers record their plans in their own process; run_batch merges their reports with merge_report(), so the
+# stage seconds are summed over the workers. cProfile (profile_stage) only covers the parent process.
+
+enabled = False
+_stages = {}  # stage name -> [seconds, calls]
+_counters = {}
+_profile_stage = None
+_profiler = None
+_start_time = None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if self.name == _profile_stage:
+            _profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if self.name == _profile_stage:
+            _profiler.disable()
+        record = _stages.setdefault(self.name, [0.0, 0])
+        record[0] += elapsed
+        record[1] += 1
+        return False
+
+
+def enable(profile_stage=None):
+    # profile_stage - name of the stage to run under cProfile
+    global enabled, _profile_stage, _profiler, _start_time
+    enabled = True
+    _start_time = time.perf_counter()
+    _profile_stage = profile_stage
+    _profiler = cProfile.Profile() if profile_stage else None
+
+
+def stage(name):
+    if not enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def timed(name):
+    # Decorator recording every call of the function as the stage name
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with _Stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset():
+    # Forget the recorded stages and counters (a batch worker reports every plan on its own)
+    _stages.clear()
+    _counters.clear()
+
+
+def merge_report(report):
+    # Add the stages and counters of a get_report() of another process
+    for name, stage_report in report["stages"].items():
+        record = _stages.setdefault(name, [0.0, 0])
+        record[0] += stage_report["seconds"]
+        record[1] += stage_report["calls"]
+    for name, amount in report["counters"].items():
+        count(name, amount)
+
+
+def get_report():
+    return {
+        "total-seconds": time.perf_counter() - _start_time if _start_time is not None else 0.0,
+        "stages": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in _stages.items()},
+        "counters": dict(_counters),
+    }
+
+
+def write_report(output_file):
+    if not enabled:
+        return
+    with open(output_file, 'w') as file:
+        json.dump(get_report(), file, indent=2)
+    print(f"Profile report saved to {output_file}")
+    if _profiler is not None:
+        profile_file = f"{_profile_stage}.prof"
+        _profiler.dump_stats(profile_file)
+        print(f"cProfile dump of the {_profile_stage} stage saved to {profile_file}")
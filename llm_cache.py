@@ -0,0 +1,67 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# Persistent cache of chat completion answers in a SQLite file.
+# An entry is keyed by the hash of model, system message, prompt and sampling parameters. Entries older than ttl
+# seconds are treated as missing, and when there are more than max_entries entries the least recently used ones
+# are evicted on close(). The lookups are committed with commit() before the prompts are sent, so the write lock
+# isn't held while waiting for the API; the new answers are committed in one transaction on close().
+class LlmCache:
+    def __init__(self, path, ttl=30 * 24 * 3600, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Batch workers may share the file, wait for the lock of another process instead of failing
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+
+    @staticmethod
+    def make_key(model, system_message, prompt, params):
+        # params - sampling parameters of the request (temperature, max_tokens, ...)
+        data = json.dumps([model, system_message, prompt, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(data.encode('utf-8'), digest_size=20).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        row = self.connection.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and self.ttl and now - row[1] > self.ttl:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.connection.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def commit(self):
+        self.connection.commit()
+
+    def put(self, key, response):
+        now = time.time()
+        self.connection.execute("INSERT OR REPLACE INTO responses (key, response, created, used) VALUES (?, ?, ?, ?)",
+                                (key, response, now, now))
+
+    def _evict(self):
+        count = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used LIMIT ?)",
+                (count - self.max_entries,))
+
+    def close(self):
+        try:
+            self._evict()
+            self.connection.commit()
+        finally:
+            self.connection.close()
+
+    def get_stats_line(self):
+        return f"LLM cache: {self.hits} hit(s), {self.misses} miss(es)"
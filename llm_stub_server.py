@@ -0,0 +1,95 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal OpenAI compatible chat completions server to run the enrichment stage offline:
+#   python llm_stub_server.py --port 8766 --delay 0.2 --fail-rate 0.1
+#   week_organizer_main.py --enrich --llm-base-url http://127.0.0.1:8766/v1
+# Answers every prompt with a canned text after the given delay. --fail-rate makes a share of the requests fail
+# with HTTP 500 to exercise the client retries. Prints the highest number of requests served at the same time.
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = next((m["content"] for m in reversed(request.get("messages", [])) if m.get("role") == "user"), "")
+
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(server.delay)
+            if server.rng.random() < server.fail_rate:
+                self._send_json(500, {"error": {"message": "stub failure"}})
+                return
+            self._send_json(200, {
+                "id": f"stub-{server.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f"Stub answer to: {prompt}"},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(port, delay=0.1, fail_rate=0.0, verbose=False, host="127.0.0.1"):
+    # Port 0 picks a free port (server.server_address[1])
+    server = ThreadingHTTPServer((host, port), StubRequestHandler)
+    server.delay = delay
+    server.fail_rate = fail_rate
+    server.verbose = verbose
+    server.rng = random.Random(0)
+    server.lock = threading.Lock()
+    server.requests = server.active = server.max_active = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI compatible stub server for offline runs of the enrichment stage")
+    parser.add_argument("--port", type=int, default=8766, help="Port on localhost. Defaults to 8766")
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds to wait before every answer")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of the requests answered with HTTP 500")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.delay, args.fail_rate, args.verbose)
+    print(f"Stub chat completions API on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.requests} requests, at most {server.max_active} at a time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import instrumentation
+from task_loader import TAG_IDS, available_tags
+
+# History of the saved plans in a SQLite file of the stash-dir of the configuration (stash/plan-history.sqlite).
+# Every planned day of a task is one entry (date, tag, task, description); finished tasks are marked done with the
+# date they were done. Entries are indexed by date, by tag and date and by task, so the lookup of the tasks of the
+# last weeks reads only those weeks no matter how long the history is, and the plan CSVs are never parsed again.
+# A plan saved again to the same file replaces its previous entries.
+#
+#   python plan_history.py done workout-abs [--tag HLT] [--date 05-Jun-2024]   mark a task done
+#   python plan_history.py recent [--days 28]                                    list the recent tasks
+#   python plan_history.py import 03-Jun-2024-week-plan.csv ...                  add plans saved before the history
+
+HISTORY_FILE = "plan-history.sqlite"
+
+# record - save the plans to the history; avoid_days - tasks planned or done that many days before the start date
+# get their pickup-priority multiplied by recent_weight (0 excludes them), 0 days disables it
+HistorySettings = namedtuple('HistorySettings', 'record avoid_days recent_weight')
+
+
+def get_history_path(cfg):
+    return os.path.join(cfg.stash_dir, HISTORY_FILE) if cfg.stash_dir else None
+
+
+def _to_iso(date_string):
+    # "03-Jun-2024" or "03-Jun-2024 Monday" (plan CSV Date column) -> "2024-06-03"
+    return datetime.strptime(date_string.split()[0], "%d-%b-%Y").strftime("%Y-%m-%d")
+
+
+class PlanHistory:
+    def __init__(self, path):
+        # Imported here, sqlite3 is a noticeable part of the startup time of the runs which don't use the history
+        import sqlite3
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Batch workers may record at the same time, wait for the lock of another process instead of failing
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS plans (
+                id INTEGER PRIMARY KEY, file TEXT NOT NULL UNIQUE, start_date TEXT NOT NULL, seed INTEGER,
+                saved REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS entries (
+                plan INTEGER NOT NULL, date TEXT NOT NULL, tag TEXT NOT NULL, task TEXT NOT NULL,
+                description TEXT NOT NULL, done TEXT);
+            CREATE INDEX IF NOT EXISTS entries_date ON entries (date);
+            CREATE INDEX IF NOT EXISTS entries_tag_date ON entries (tag, date);
+            CREATE INDEX IF NOT EXISTS entries_task ON entries (task, tag);
+            CREATE INDEX IF NOT EXISTS entries_plan ON entries (plan);
+            CREATE INDEX IF NOT EXISTS entries_done ON entries (done) WHERE done IS NOT NULL;
+        """)
+
+    def _add_plan(self, file, start_date, seed, rows):
+        # rows: (iso date, tag name, task, description)
+        file = os.path.abspath(file)
+        previous = self.connection.execute("SELECT id FROM plans WHERE file = ?", (file,)).fetchone()
+        if previous is not None:
+            self.connection.execute("DELETE FROM entries WHERE plan = ?", previous)
+            self.connection.execute("DELETE FROM plans WHERE id = ?", previous)
+        plan_id = self.connection.execute("INSERT INTO plans (file, start_date, seed, saved) VALUES (?, ?, ?, ?)",
+                                          (file, start_date, seed, time.time())).lastrowid
+        self.connection.executemany("INSERT INTO entries (plan, date, tag, task, description) VALUES (?, ?, ?, ?, ?)",
+                                    [(plan_id,) + row for row in rows])
+        return len(rows)
+
+    def record_rows(self, file, plan_rows, seed=None):
+        # plan_rows - get_plan_rows() of the distribution saved to file
+        start_date, rows = plan_rows
+        return self._add_plan(file, start_date, seed, rows)
+
+    def import_plan_file(self, file, permanent_tasks=None):
+        # Plan CSV written by save_distribution_to_csv; rows without a known tag (footer, empty rows) are skipped, and
+        # like get_plan_rows the generic tasks and the permanent tasks (Configuration.permanent_tasks) aren't entries
+        from task_level_suggestion import CSV_HEADER, get_generic_task
+
+        templates = [fields for day_templates in (permanent_tasks or {}).values() for fields, _ in day_templates]
+        rows = []
+        with open(file, 'r', newline='', encoding='utf-8') as csvfile:
+            for row in csv.DictReader(csvfile):
+                tag = (row.get("Tags") or "").strip().lstrip('#').upper()
+                if tag not in TAG_IDS or not row.get("Date") or row["Task"] == get_generic_task(tag)[0]:
+                    continue
+                fields = [row.get(column) or "" for column in CSV_HEADER]
+                if any(fields[:len(template)] == [field.replace("$DATE", row["Date"]) for field in template]
+                       for template in templates):
+                    continue
+                rows.append((_to_iso(row["Date"]), tag, row["Task"], row.get("Description") or ""))
+        if not rows:
+            return 0
+        return self._add_plan(file, min(row[0] for row in rows), None, rows)
+
+    def get_recent_keys(self, start_date, days):
+        # (tag id, task, description) of the tasks planned in the days before start_date or done in that time
+        until = _to_iso(start_date)
+        since = (datetime.strptime(until, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+        rows = self.connection.execute(
+            "SELECT tag, task, description FROM entries WHERE date >= ? AND date < ? "
+            "UNION SELECT tag, task, description FROM entries WHERE done >= ? AND done <= ?",
+            (since, until, since, until))
+        return {(TAG_IDS[tag], task, description) for tag, task, description in rows if tag in TAG_IDS}
+
+    def mark_done(self, task, tag=None, date=None):
+        # Marks the planned days of the task up to date (today by default), returns their count
+        done = _to_iso(date) if date else datetime.now().strftime("%Y-%m-%d")
+        query = "UPDATE entries SET done = ? WHERE task = ? AND date <= ? AND done IS NULL"
+        params = [done, task, done]
+        if tag:
+            query += " AND tag = ?"
+            params.append(tag.strip().lstrip('#').upper())
+        return self.connection.execute(query, params).rowcount
+
+    def get_recent_entries(self, start_date, days):
+        until = _to_iso(start_date)
+        since = (datetime.strptime(until, "%Y-%m-%d") - timedelta(days=days)).strftime("%Y-%m-%d")
+        return self.connection.execute(
+            "SELECT tag, task, description, MIN(date), MAX(date), MAX(done) FROM entries WHERE date >= ? AND date < ? "
+            "GROUP BY tag, task, description ORDER BY MIN(date)", (since, until)).fetchall()
+
+    def close(self):
+        try:
+            self.connection.commit()
+        finally:
+            self.connection.close()
+
+
+def get_plan_rows(distribution):
+    # (iso start date, entries) of a distribution. Only the tasks of the task files, generic and permanent tasks
+    # aren't picked from the pool
+    rows = []
+    for day in distribution:
+        date = _to_iso(day["date"])
+        for task in day["tasks"]:
+            if task is not None:
+                rows.append((date, available_tags[task.tag], task.task, task.description))
+    return _to_iso(distribution[0]["date"]), rows
+
+
+@instrumentation.timed("history-lookup")
+def get_recent_weights(cfg, start_date, settings):
+    # (tag, task, description) -> pickup-priority multiplier of the recent tasks of the history, empty if disabled
+    path = get_history_path(cfg)
+    if settings is None or not settings.avoid_days or path is None or not os.path.exists(path):
+        return {}
+    history = PlanHistory(path)
+    try:
+        recent = history.get_recent_keys(start_date, settings.avoid_days)
+    finally:
+        history.close()
+    return {key: settings.recent_weight for key in recent}
+
+
+def apply_history(task_pool, cfg, start_date, settings):
+    # Down-weights the recent tasks of the history in the task pool, returns their count
+    weights = get_recent_weights(cfg, start_date, settings)
+    task_pool.set_weight_factors(weights)
+    return len(weights)
+
+
+def record_plans(plans, settings):
+    # plans - (cfg, saved files, seed, get_plan_rows() of the distribution); one transaction per history file
+    if settings is None or not settings.record:
+        return
+    by_path = {}
+    for cfg, files, seed, plan_rows in plans:
+        path = get_history_path(cfg)
+        if path is not None and files:
+            by_path.setdefault(path, []).append((files[0], plan_rows, seed))
+    for path, path_plans in by_path.items():
+        history = PlanHistory(path)
+        try:
+            for file, plan_rows, seed in path_plans:
+                history.record_rows(file, plan_rows, seed)
+        finally:
+            history.close()
+
+
+def record_plan(cfg, distribution, files, seed, settings):
+    record_plans([(cfg, files, seed, get_plan_rows(distribution))], settings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan history of the stash-dir of the configuration")
+    parser.add_argument("--cfg", default="task-configuration.json", help="Configuration file (its stash-dir)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    done_parser = commands.add_parser("done", help="Mark a planned task done")
+    done_parser.add_argument("task", help="Task name (Task column)")
+    done_parser.add_argument("--tag", help="Tag of the task if the name is used by several tags")
+    done_parser.add_argument("--date", help="Date the task was done (DD-MMM-YYYY). Defaults to today")
+    recent_parser = commands.add_parser("recent", help="List the tasks planned in the last days")
+    recent_parser.add_argument("--days", type=int, default=28, help="Number of days. Defaults to 28")
+    recent_parser.add_argument("--date", help="Last day (DD-MMM-YYYY), excluded. Defaults to today")
+    import_parser = commands.add_parser("import", help="Add plan CSV files saved before the history")
+    import_parser.add_argument("files", nargs='+', help="Plan CSV files")
+    args = parser.parse_args()
+
+    import week_organizer_main
+    cfg = week_organizer_main.load_configuration(args.cfg)
+    path = get_history_path(cfg)
+    if path is None:
+        print(f"Error: {args.cfg} has no stash-dir.")
+        sys.exit(1)
+
+    history = PlanHistory(path)
+    try:
+        if args.command == "done":
+            count = history.mark_done(args.task, args.tag, args.date)
+            if count == 0:
+                print(f"'{args.task}' isn't planned or is already done.")
+                sys.exit(1)
+            print(f"Marked {count} planned day(s) of '{args.task}' done.")
+        elif args.command == "recent":
+            date = args.date or datetime.now().strftime("%d-%b-%Y")
+            for tag, task, description, first, last, done in history.get_recent_entries(date, args.days):
+                status = f"done {done}" if done else "planned"
+                print(f"#{tag} {task} ({description}): {first} - {last}, {status}")
+        else:
+            for file in args.files:
+                print(f"{file}: {history.import_plan_file(file, cfg.permanent_tasks)} entries")
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+# Thin client of planner_daemon.py. Only the standard library is imported up front, so a request to a running
+# daemon costs a few milliseconds. Without a daemon the plan is generated in this process (same result for a seed).
+
+DEFAULT_PORT = 8765
+
+
+def get_default_token_path(port):
+    import task_cache
+
+    return os.path.join(task_cache.get_user_cache_dir(), f"daemon-{port}.token")
+
+
+def read_token(token_path):
+    # The token the daemon wrote on start, None if there is none (no daemon or not readable)
+    try:
+        with open(token_path, 'r') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def request_plan(port, payload, token, timeout=60):
+    # Returns (status, response) of the daemon or None if no daemon is listening on the port
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/plan",
+        data=json.dumps(payload).encode('utf-8'),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+        method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def plan_in_process(payload):
+    import batch_planner
+    import plan_history
+    import seeding
+    import week_organizer_main
+    from task_pool import TaskPool
+
+    cfg = week_organizer_main.load_configuration(payload["cfg"])
+    tasks_db = week_organizer_main.load_csv_files_from_directory(cfg.tasks_dir, False, True)
+    seed = payload["seed"] if payload["seed"] is not None else seeding.new_seed()
+    history = plan_history.HistorySettings(payload["history"], payload["avoid_recent"], payload["recent_weight"])
+    files = batch_planner.generate_plan(TaskPool(tasks_db), cfg, payload["start_date"], payload["output"], seed, False,
+                                        payload["weeks"], payload["split_weeks"], history=history)
+    return {"files": files, "seed": seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a plan with the running planner daemon, or in process if there is none")
+    parser.add_argument("--start-date", help="The start date in DD-MMM-YYYY format. Defaults to today's date")
+    parser.add_argument("--output", help='Output CSV file. Defaults to "date-week-plan.csv"')
+    parser.add_argument("--cfg", default="task-configuration.json", help="Configuration file, must be the one the daemon serves")
+    parser.add_argument("--seed", type=int, help="Seed of the random generators. A random seed is used if not specified")
+    parser.add_argument("--weeks", type=int, default=1, help="Number of weeks to plan")
+    parser.add_argument("--split-weeks", action="store_true", help="Save every week to its own CSV file")
+    parser.add_argument("--avoid-recent", type=int, default=0, metavar="DAYS", help="Avoid the tasks planned or done in the DAYS days before the start date")
+    parser.add_argument("--recent-weight", type=float, default=0.0, help="Pickup-priority multiplier of the avoided tasks. Defaults to 0 (not picked)")
+    parser.add_argument("--no-history", action="store_true", help="Don't record the plan in the plan history")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port of the daemon. Defaults to {DEFAULT_PORT}")
+    parser.add_argument("--token-file", help="Token file of the daemon. Defaults to daemon-PORT.token in the user's cache directory")
+    parser.add_argument("--no-daemon", action="store_true", help="Don't try the daemon, always plan in process")
+    args = parser.parse_args()
+
+    start_date = args.start_date or datetime.now().strftime("%d-%b-%Y")
+    try:
+        datetime.strptime(start_date, "%d-%b-%Y")
+    except ValueError:
+        print(f"Error: '{start_date}' is not a DD-MMM-YYYY date.")
+        sys.exit(1)
+    if args.weeks < 1:
+        print("Error: --weeks must be at least 1.")
+        sys.exit(1)
+    if args.avoid_recent < 0 or args.recent_weight < 0:
+        print("Error: --avoid-recent and --recent-weight can't be negative.")
+        sys.exit(1)
+    payload = {
+        "cfg": os.path.abspath(args.cfg),
+        "start_date": start_date,
+        # The daemon may run in another directory
+        "output": os.path.abspath(args.output or f"{start_date}-week-plan.csv"),
+        "seed": args.seed,
+        "weeks": args.weeks,
+        "split_weeks": args.split_weeks,
+        "history": not args.no_history,
+        "avoid_recent": args.avoid_recent,
+        "recent_weight": args.recent_weight,
+    }
+
+    token = None if args.no_daemon else read_token(args.token_file or get_default_token_path(args.port))
+    result = None if token is None else request_plan(args.port, payload, token)
+    if result is not None:
+        status, response = result
+        if status == 200:
+            plan = response
+        elif status in (401, 403, 409):
+            # Another daemon, another token or an output outside of the output directory of the daemon
+            print(f"{response['error']}, planning in process")
+            plan = plan_in_process(payload)
+        else:
+            print(f"Error: {response['error']}")
+            sys.exit(1)
+    else:
+        plan = plan_in_process(payload)
+
+    for output_file in plan["files"]:
+        print(f"Saved plan to {output_file}")
+    print(f"Seed: {plan['seed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import hmac
+import json
+import os
+import secrets
+import sys
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import batch_planner
+import plan_history
+import seeding
+import task_configuration
+import week_organizer_main
+from planner_client import DEFAULT_PORT, get_default_token_path
+from task_pool import TaskPool
+
+# Resident planner: keeps the configuration and the task pool in memory and generates plans on request.
+# Listens on localhost only. Requests are served one by one, the task pool is shared by all of them.
+# Localhost is not a boundary (other local users, web pages in the browser), so every request needs the random token
+# the daemon writes to its token file on start (mode 0600) as "Authorization: Bearer TOKEN", POST bodies must be
+# application/json, and plans are only written inside the output directory of the daemon.
+#
+#   POST /plan    {"cfg", "start_date", "output", "seed", "weeks", "split_weeks", "history", "avoid_recent",
+#                  "recent_weight"} -> {"files", "seed", "seconds"}; an output outside of the output directory is
+#                 refused with HTTP 403
+#   POST /reload  re-read the configuration and the tasks directory (after editing the task files); a broken
+#                 configuration is reported with HTTP 500 and the previous one is served further
+#   GET  /status  -> {"cfg", "tasks", "plans"}
+
+
+class PlannerState:
+    def __init__(self, cfg_path, use_cache=True, jobs=1, output_dir="."):
+        self.cfg_path = os.path.abspath(cfg_path)
+        self.output_dir = os.path.realpath(output_dir)
+        if not os.path.isdir(self.output_dir):
+            raise FileNotFoundError(f"Output directory {self.output_dir} does not exist")
+        self.use_cache = use_cache
+        self.jobs = jobs
+        self.plans = 0
+        self.reload()
+
+    def reload(self):
+        # Raises ConfigurationError or OSError for a broken configuration, the served state is kept then
+        cfg = task_configuration.load_configuration(self.cfg_path)
+        if not os.path.isdir(cfg.tasks_dir):
+            raise FileNotFoundError(f"tasks-dir {cfg.tasks_dir} of {self.cfg_path} does not exist")
+        tasks_db = week_organizer_main.load_csv_files_from_directory(cfg.tasks_dir, False, self.use_cache, False, self.jobs)
+        self.cfg = cfg
+        self.task_pool = TaskPool(tasks_db)
+        self.tasks_count = len(tasks_db)
+
+    def get_status(self):
+        return {"cfg": self.cfg_path, "tasks": self.tasks_count, "plans": self.plans}
+
+    def generate(self, request):
+        # Raises ValueError for a bad request
+        start_date = request.get("start_date") or datetime.now().strftime("%d-%b-%Y")
+        datetime.strptime(start_date, "%d-%b-%Y")
+        weeks = int(request.get("weeks", 1))
+        if weeks < 1:
+            raise ValueError("weeks must be at least 1")
+        seed = request.get("seed")
+        if seed is None:
+            seed = seeding.new_seed()
+        elif type(seed) is not int or not -2**63 <= seed < 2**63:
+            raise ValueError("seed must be a 64-bit integer")
+        output_file = self.get_output_file(request.get("output") or f"{start_date}-week-plan.csv")
+        history = plan_history.HistorySettings(bool(request.get("history", True)), int(request.get("avoid_recent", 0)),
+                                               float(request.get("recent_weight", 0.0)))
+        if history.avoid_days < 0 or history.recent_weight < 0:
+            raise ValueError("avoid_recent and recent_weight can't be negative")
+
+        start = time.perf_counter()
+        files = batch_planner.generate_plan(self.task_pool, self.cfg, start_date, output_file, seed, False, weeks,
+                                            bool(request.get("split_weeks")), history=history)
+        self.plans += 1
+        return {"files": files, "seed": seed, "seconds": time.perf_counter() - start}
+
+
+    def get_output_file(self, output):
+        # Relative outputs are in the output directory; raises PermissionError for a path outside of it
+        output_file = os.path.realpath(os.path.join(self.output_dir, output))
+        if os.path.commonpath([output_file, self.output_dir]) != self.output_dir:
+            raise PermissionError(f"{output_file} is outside of the output directory {self.output_dir}")
+        return output_file
+
+
+def write_token(token_path):
+    # A new random token for every run of the daemon, readable by its user only
+    if os.path.dirname(token_path):
+        os.makedirs(os.path.dirname(token_path), mode=0o700, exist_ok=True)
+    try:
+        os.remove(token_path)
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(32)
+    with open(os.open(token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'w') as file:
+        file.write(token)
+    return token
+
+
+class PlannerRequestHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _check_request(self, has_body):
+        # A web page can't set the Authorization header without a preflight (which isn't served) and can't read the
+        # token; a text/plain body is what it can send without one, so only application/json is accepted
+        authorization = self.headers.get("Authorization", "").encode('utf-8')
+        if not hmac.compare_digest(authorization, f"Bearer {self.server.token}".encode('utf-8')):
+            self._send_json(401, {"error": "Missing or wrong token, see the token file of the daemon"})
+            return False
+        if has_body and self.headers.get_content_type() != "application/json":
+            self._send_json(415, {"error": "Request body must be application/json"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._check_request(False):
+            return
+        if self.path == "/status":
+            self._send_json(200, self.server.state.get_status())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self._check_request(True):
+            return
+        state = self.server.state
+        try:
+            request = self._read_json()
+        except ValueError:
+            self._send_json(400, {"error": "Request body is not valid JSON"})
+            return
+
+        if self.path == "/plan":
+            cfg_path = request.get("cfg")
+            if cfg_path and os.path.abspath(cfg_path) != state.cfg_path:
+                self._send_json(409, {"error": f"The daemon serves {state.cfg_path}"})
+                return
+            try:
+                self._send_json(200, state.generate(request))
+            except PermissionError as error:
+                self._send_json(403, {"error": str(error)})
+            except (ValueError, TypeError) as error:
+                self._send_json(400, {"error": str(error)})
+            except OSError as error:
+                self._send_json(500, {"error": f"Can't save the plan: {error}"})
+        elif self.path == "/reload":
+            try:
+                state.reload()
+            except (task_configuration.ConfigurationError, OSError) as error:
+                self._send_json(500, {"error": f"Reload failed, still serving the previous configuration: {error}"})
+                return
+            self._send_json(200, state.get_status())
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the configuration and the tasks in memory and generate plans on request (see planner_client.py)")
+    parser.add_argument("--cfg", default="task-configuration.json", help="Configuration file to serve")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port on localhost. Defaults to {DEFAULT_PORT}")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every task CSV file instead of using the parsed task cache")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker threads used to load the task CSV files")
+    parser.add_argument("--output-dir", default=".", help="Directory the plans are written to, outputs outside of it are refused. Defaults to the current directory")
+    parser.add_argument("--token-file", help="File the request token is written to. Defaults to daemon-PORT.token in the user's cache directory")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    try:
+        state = PlannerState(args.cfg, not args.no_cache, max(1, args.jobs), args.output_dir)
+    except (task_configuration.ConfigurationError, OSError) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+    token_file = args.token_file or get_default_token_path(args.port)
+    server = HTTPServer(("127.0.0.1", args.port), PlannerRequestHandler)
+    server.state = state
+    server.token = write_token(token_file)
+    server.verbose = args.verbose
+    print(f"Serving {state.cfg_path} ({state.tasks_count} tasks) on http://127.0.0.1:{args.port}, "
+          f"plans go to {state.output_dir}, token in {token_file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.remove(token_file)
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    main()
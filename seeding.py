@@ -0,0 +1,13 @@
+import random
+
+# Every plan has a seed. The tag level and the task level stages draw from separate streams derived from it,
+# so regenerating the tasks never changes the tag schedule and a plan can be reproduced from its seed.
+
+
+def new_seed():
+    return random.SystemRandom().randrange(2**32)
+
+
+def make_stage_rngs(seed):
+    # (tag level rng, task level rng)
+    return random.Random(f"{seed}:tag-level"), random.Random(f"{seed}:task-level")
@@ -1,247 +1,409 @@
-import json
 import random
+import bisect
 import argparse
 import sys
 import os
-import platform
-from colorama import init, Fore, Style
-
-# Initialize colorama
-init(autoreset=True)
-
-ANSI_COLORS = {
-    "#000000": Fore.BLACK, "#800000": Fore.RED, "#008000": Fore.GREEN, "#808000": Fore.YELLOW, 
-    "#000080": Fore.BLUE, "#800080": Fore.MAGENTA, "#008080": Fore.CYAN, "#c0c0c0": Fore.WHITE, 
-    "#808080": Fore.LIGHTBLACK_EX, "#ff0000": Fore.LIGHTRED_EX, "#00ff00": Fore.LIGHTGREEN_EX, 
-    "#ffff00": Fore.LIGHTYELLOW_EX, "#0000ff": Fore.LIGHTBLUE_EX, "#ff00ff": Fore.LIGHTMAGENTA_EX, 
-    "#00ffff": Fore.LIGHTCYAN_EX, "#ffffff": Fore.LIGHTWHITE_EX, "#ff9900": Fore.YELLOW, 
-    "#9fc5e8": Fore.LIGHTCYAN_EX, "#9900ff": Fore.LIGHTMAGENTA_EX, "#1155cc": Fore.LIGHTBLUE_EX, 
-    "#6aa84f": Fore.LIGHTGREEN_EX, "#bf9000": Fore.YELLOW
-}
+import seeding
+import instrumentation
+import task_configuration
+
+# colorama is imported and initialized on the first colored print only: batch runs and the planner daemon never
+# print colors, and the import is a good part of the startup time
+ANSI_COLORS = {}
+DEFAULT_COLOR = None
+RESET_COLOR = "\033[0m"  # colorama Style.RESET_ALL
+
+
+def _init_colors():
+    global DEFAULT_COLOR
+    from colorama import init, Fore
+    init(autoreset=True)
+    DEFAULT_COLOR = Fore.WHITE
+    ANSI_COLORS.update({
+        "#000000": Fore.BLACK, "#800000": Fore.RED, "#008000": Fore.GREEN, "#808000": Fore.YELLOW, 
+        "#000080": Fore.BLUE, "#800080": Fore.MAGENTA, "#008080": Fore.CYAN, "#c0c0c0": Fore.WHITE, 
+        "#808080": Fore.LIGHTBLACK_EX, "#ff0000": Fore.LIGHTRED_EX, "#00ff00": Fore.LIGHTGREEN_EX, 
+        "#ffff00": Fore.LIGHTYELLOW_EX, "#0000ff": Fore.LIGHTBLUE_EX, "#ff00ff": Fore.LIGHTMAGENTA_EX, 
+        "#00ffff": Fore.LIGHTCYAN_EX, "#ffffff": Fore.LIGHTWHITE_EX, "#ff9900": Fore.YELLOW, 
+        "#9fc5e8": Fore.LIGHTCYAN_EX, "#9900ff": Fore.LIGHTMAGENTA_EX, "#1155cc": Fore.LIGHTBLUE_EX, 
+        "#6aa84f": Fore.LIGHTGREEN_EX, "#bf9000": Fore.YELLOW
+    })
+
 
 def clear_console():
     # Check the operating system
+    import platform
     if platform.system() == "Windows":
         os.system("cls")  # For Windows
     else:
         os.system("clear")  # For Unix-like systems
 
-def load_configuration(file_path):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-    return data["tag-distribution"]["daily-priorities"]
-
-def get_tag_ranges(tag):
-    if len(tag["weekly-amount-days"]) == 1:
-        weekly_amount_min = weekly_amount_max = tag["weekly-amount-days"][0]
-    else:
-        weekly_amount_min, weekly_amount_max = tag["weekly-amount-days"]
-    
-    daily_amounts = tag["daily-amount"]
-    if len(daily_amounts) == 1:
-        daily_min = daily_max = daily_amounts[0]
-    else:
-        daily_min, daily_max = daily_amounts
-    
-    return weekly_amount_min, weekly_amount_max, daily_min, daily_max
-
-def generate_schedule(priorities):
+# A schedule is (weekly_schedule, tag_counts, tag_ranges): tag ids of every day sorted by sorting-index, total of
+# every tag and its (min, max) weekly total; tag_counts and tag_ranges are lists indexed by tag id
+# (see task_configuration.Configuration).
+@instrumentation.timed("tag-generation")
+def generate_schedule(config, rng=random):
     weekly_schedule = [[] for _ in range(7)]
-    tag_counts = {tag: 0 for tag in priorities}
-    tag_ranges = {tag: () for tag in priorities}
+    tag_counts = [0] * len(config.labels)
 
-    for tag_name, tag in priorities.items():
-        weekly_amount_min, weekly_amount_max, daily_min, daily_max = get_tag_ranges(tag)
-        
-        weekly_amount = random.choice(tag["weekly-amount-days"])
-
-        tag_min = weekly_amount_min * daily_min
-        tag_max = weekly_amount_max * daily_max
-        tag_ranges[tag_name] = (tag_min, tag_max)
+    for tag in config.tag_ids:
+        daily_min = config.daily_min[tag]
+        daily_max = config.daily_max[tag]
+        weekly_amount = rng.choice(config.weekly_amount_days[tag])
 
         days_to_fill = list(range(7))
-        random.shuffle(days_to_fill)
+        rng.shuffle(days_to_fill)
         days_to_fill = days_to_fill[:weekly_amount]
 
         for day in days_to_fill:
-            daily_amount = random.randint(daily_min, daily_max)
-            weekly_schedule[day].extend([tag_name] * daily_amount)
-            tag_counts[tag_name] += daily_amount
+            daily_amount = rng.randint(daily_min, daily_max)
+            weekly_schedule[day].extend([tag] * daily_amount)
+            tag_counts[tag] += daily_amount
 
     # Sort the schedule after adjustment
     for day in range(7):
-        weekly_schedule[day].sort(key=lambda tag_name: priorities[tag_name]["sorting-index"])
+        weekly_schedule[day].sort(key=config.sorting_index.__getitem__)
+
+    return weekly_schedule, tag_counts, config.tag_ranges
+
+
+# Concatenate the weeks of a multi-week horizon: the quotas are applied per week by the schedule of every week,
+# the task level stage fills the whole horizon at once, so the tag counts are summed over the weeks
+def merge_schedules(schedules):
+    horizon_schedule = []
+    horizon_counts = [0] * len(schedules[0][1])
+    for weekly_schedule, tag_counts, _ in schedules:
+        horizon_schedule.extend(weekly_schedule)
+        for tag, count in enumerate(tag_counts):
+            horizon_counts[tag] += count
+    return horizon_schedule, horizon_counts, schedules[0][2]
+
+
+# Weekly totals a tag can have: (amount of days, total) for every amount of days in the weekly range
+def get_tag_total_options(config, tag):
+    daily_min = config.daily_min[tag]
+    daily_max = config.daily_max[tag]
+    options = []
+    for days_amount in range(config.weekly_min[tag], min(config.weekly_max[tag], 7) + 1):
+        for total in range(days_amount * daily_min, days_amount * daily_max + 1):
+            options.append((days_amount, total))
+    return options
+
+
+def get_load_range(config):
+    # Smallest and largest total weekly load the configuration allows
+    min_load = max_load = 0
+    for tag in config.tag_ids:
+        totals = [total for _, total in get_tag_total_options(config, tag)]
+        min_load += min(totals)
+        max_load += max(totals)
+    return min_load, max_load
+
+
+def get_target_load_for_difficulty(config, difficulty):
+    # difficulty 0..100 -> total weekly load between the smallest and the largest possible one
+    min_load, max_load = get_load_range(config)
+    return min_load + round((max_load - min_load) * min(max(difficulty, 0), 100) / 100)
+
+
+# Builds a schedule with exactly target_load tags in the week in one step (instead of random generation followed by
+# many 'i'/'d' adjustments). Dynamic programming over the tags finds the reachable weekly totals, then a random
+# solution is walked back: every tag gets a total and an amount of days within its weekly-amount-days and
+# daily-amount ranges (so within its tag_ranges too). The days of every tag are the least loaded ones.
+# Returns None if the target can't be met.
+@instrumentation.timed("tag-solving")
+def solve_schedule(config, target_load, rng=random):
+    tag_ids = config.tag_ids
+    tag_options = [get_tag_total_options(config, tag) for tag in tag_ids]
+
+    # reachable[i] - set of total loads reachable with the first i tags
+    reachable = [{0}]
+    for options in tag_options:
+        totals = {total for _, total in options}
+        reachable.append({load + total for load in reachable[-1] for total in totals if load + total <= target_load})
+
+    if target_load not in reachable[-1]:
+        min_load, max_load = get_load_range(config)
+        print(f"Target load {target_load} can't be met. The configuration allows loads from {min_load} to {max_load}.")
+        return None
+
+    # Walk back choosing a random feasible option for every tag
+    chosen = [None] * len(tag_ids)
+    load = target_load
+    for i in range(len(tag_ids) - 1, -1, -1):
+        feasible = [option for option in tag_options[i] if load - option[1] in reachable[i]]
+        chosen[i] = rng.choice(feasible)
+        load -= chosen[i][1]
+
+    weekly_schedule = [[] for _ in range(7)]
+    tag_counts = [0] * len(config.labels)
+    day_loads = [0] * 7
+
+    for tag, (days_amount, total) in zip(tag_ids, chosen):
+        daily_min = config.daily_min[tag]
+        daily_max = config.daily_max[tag]
+        tag_counts[tag] = total
+        if days_amount == 0:
+            continue
+
+        # Start every day with daily_min and hand out the rest one by one to days which are still below daily_max
+        daily_amounts = [daily_min] * days_amount
+        for _ in range(total - days_amount * daily_min):
+            day_index = rng.choice([i for i, amount in enumerate(daily_amounts) if amount < daily_max])
+            daily_amounts[day_index] += 1
+
+        days_to_fill = sorted(range(7), key=lambda day: (day_loads[day], rng.random()))[:days_amount]
+        # The biggest amounts go to the least loaded days
+        for day, daily_amount in zip(days_to_fill, sorted(daily_amounts, reverse=True)):
+            weekly_schedule[day].extend([tag] * daily_amount)
+            day_loads[day] += daily_amount
+
+    for day in range(7):
+        weekly_schedule[day].sort(key=config.sorting_index.__getitem__)
+
+    return weekly_schedule, tag_counts, config.tag_ranges
+
+
+# Quality score of candidate schedules, lower is better. counts is a (candidates, days, tags) array of tag counts.
+# - load balance: standard deviation of the daily loads
+# - tag spread: days in a row having the same tag (beyond what its amount of days forces)
+# - tag ranges: distance of every tag total from the midpoint of its tag_ranges, relative to the range width
+def score_schedules(np, counts, tag_mins, tag_maxs):
+    day_loads = counts.sum(axis=2)
+    balance = day_loads.std(axis=1)
+
+    present = counts > 0
+    days_per_tag = present.sum(axis=1)
+    adjacent = (present[:, 1:, :] & present[:, :-1, :]).sum(axis=1)
+    forced_adjacent = np.maximum(days_per_tag * 2 - 7, 0)  # 7 days of a tag can't avoid 6 neighbours, etc.
+    spread = np.maximum(adjacent - forced_adjacent, 0).sum(axis=1) / counts.shape[2]
+
+    totals = counts.sum(axis=1)
+    midpoints = (tag_mins + tag_maxs) / 2
+    widths = np.maximum(tag_maxs - tag_mins, 1)
+    ranges = (np.abs(totals - midpoints) / widths).sum(axis=1)
+
+    return balance + spread + ranges
+
+
+# Draws candidates schedules at once as a (candidates, days, tags) count tensor with NumPy, scores them and returns
+# the best one. Amount of days and daily amounts are uniform within the weekly-amount-days and daily-amount ranges.
+@instrumentation.timed("tag-sampling")
+def sample_best_schedule(config, candidates=10000, rng=random):
+    try:
+        import numpy as np
+    except ImportError:
+        print("Best of N sampling requires numpy (pip install numpy). Generating a random week instead.")
+        return generate_schedule(config, rng)
+
+    generator = np.random.default_rng(rng.getrandbits(64))
+    tag_ids = config.tag_ids
+    weekly_min, weekly_max, daily_min, daily_max = (
+        np.array([values[tag] for tag in tag_ids])
+        for values in (config.weekly_min, config.weekly_max, config.daily_min, config.daily_max))
+    weekly_max = np.minimum(weekly_max, 7)
+
+    # Amount of days of every tag and which days: the days with the smallest random keys
+    days_amount = generator.integers(weekly_min, weekly_max + 1, size=(candidates, len(tag_ids)))
+    day_ranks = generator.random((candidates, len(tag_ids), 7)).argsort(axis=2).argsort(axis=2)
+    chosen_days = day_ranks < days_amount[:, :, None]
+    daily_amounts = generator.integers(daily_min[:, None], daily_max[:, None] + 1, size=(candidates, len(tag_ids), 7))
+    counts = np.where(chosen_days, daily_amounts, 0).transpose(0, 2, 1)
+
+    scores = score_schedules(np, counts, weekly_min * daily_min, weekly_max * daily_max)
+    best = counts[int(scores.argmin())]
+
+    weekly_schedule = [[] for _ in range(7)]
+    tag_counts = [0] * len(config.labels)
+    sorted_tags = sorted(range(len(tag_ids)), key=lambda i: config.sorting_index[tag_ids[i]])
+    for tag_index, tag in enumerate(tag_ids):
+        tag_counts[tag] = int(best[:, tag_index].sum())
+    for day in range(7):
+        for tag_index in sorted_tags:
+            weekly_schedule[day].extend([tag_ids[tag_index]] * int(best[day, tag_index]))
 
-    return weekly_schedule, tag_counts, tag_ranges
+    return weekly_schedule, tag_counts, config.tag_ranges
 
     
 # 1. try to reduce/increase daily amount (check daily-amount range)
 # 2. try to reduce/increase weekly ammount (check weekly range)
 #    - for inc: add entire day with maximum daily-amount tag for this day
 #    - for dec: remove entire day (remove all specified tags from 1 day, for example removes all #HLT from day 2)
-def adjust_schedule(weekly_schedule, tag_counts, tag_ranges, priorities, easier=True):
+def build_day_counts(weekly_schedule, config):
+    # day x tag count matrix of weekly_schedule: day_counts[day][tag id]
+    day_counts = []
+    for tags in weekly_schedule:
+        counts = [0] * len(config.labels)
+        for tag in tags:
+            counts[tag] += 1
+        day_counts.append(counts)
+    return day_counts
+
+
+@instrumentation.timed("tag-adjustment")
+def adjust_schedule(weekly_schedule, tag_counts, tag_ranges, config, easier=True, rng=random, day_counts=None):
+    # day_counts (see build_day_counts) is kept up to date with weekly_schedule, pass it to avoid recounting every day
+    if day_counts is None:
+        day_counts = build_day_counts(weekly_schedule, config)
+
+    def get_days_to_adjust(tag):
+        if easier:
+            daily_min = config.daily_min[tag]
+            return [day for day, counts in enumerate(day_counts) if counts[tag] > daily_min]
+        daily_max = config.daily_max[tag]
+        return [day for day, counts in enumerate(day_counts) if counts[tag] < daily_max]
+
     eligible_tags = []
 
     # Identify tags that meet the adjustment criteria
-    for tag, (min_count, max_count) in tag_ranges.items():
-        if easier:
-            if tag_counts[tag] > min_count:
-                days_with_tag = [
-                    day for day, tags in enumerate(weekly_schedule) 
-                    if tags.count(tag) > priorities[tag]["daily-amount"][0]
-                ]
-                if days_with_tag:
-                    eligible_tags.append(tag)
-        else:
-            if tag_counts[tag] < max_count:
-                days_without_tag = [
-                    day for day, tags in enumerate(weekly_schedule) 
-                    if tags.count(tag) < priorities[tag]["daily-amount"][-1]
-                ]
-                if days_without_tag:
-                    eligible_tags.append(tag)
+    for tag in config.tag_ids:
+        min_count, max_count = tag_ranges[tag]
+        if (tag_counts[tag] > min_count) if easier else (tag_counts[tag] < max_count):
+            if get_days_to_adjust(tag):
+                eligible_tags.append(tag)
 
     if not eligible_tags:
         print("No more adjustment suggestion avaialable. Regenerate if you're not satisfied with the result.")        
         return weekly_schedule, tag_counts
 
-    tag = random.choice(eligible_tags)
+    tag = rng.choice(eligible_tags)
+    day_to_adjust = rng.choice(get_days_to_adjust(tag))
 
     if easier:
-        print(f"Decreasing count of {tag}")
-        
-        days_with_tag = [
-            day for day, tags in enumerate(weekly_schedule) 
-            if tags.count(tag) > priorities[tag]["daily-amount"][0]
-        ]
-        
-        if not days_with_tag:
-            print("No more adjustment suggestion avaialable. Regenerate if you're not satisfied with the result.")        
-            return weekly_schedule, tag_counts
-
-        day_to_adjust = random.choice(days_with_tag)
+        print(f"Decreasing count of {config.labels[tag]}")
         weekly_schedule[day_to_adjust].remove(tag)
+        day_counts[day_to_adjust][tag] -= 1
         tag_counts[tag] -= 1
-        
     else:
-        print(f"Increasing count of {tag}")
-        
-        days_without_tag = [
-            day for day, tags in enumerate(weekly_schedule) 
-            if tags.count(tag) < priorities[tag]["daily-amount"][-1]
-        ]
-        
-        if not days_without_tag:
-            print("No more adjustment suggestion avaialable. Regenerate if you're not satisfied with the result.")        
-            return weekly_schedule, tag_counts
-
-        day_to_adjust = random.choice(days_without_tag)
-        weekly_schedule[day_to_adjust].append(tag)
+        print(f"Increasing count of {config.labels[tag]}")
+        # Insert at the sorted position (after the tags with the same sorting-index) instead of sorting the week again
+        bisect.insort(weekly_schedule[day_to_adjust], tag, key=config.sorting_index.__getitem__)
+        day_counts[day_to_adjust][tag] += 1
         tag_counts[tag] += 1
 
-    # Sort the schedule after adjustment
-    for day in range(7):
-        weekly_schedule[day].sort(key=lambda task: priorities[task]["sorting-index"])
-
     return weekly_schedule, tag_counts
 
 
 def get_color(hex_code):
-    return ANSI_COLORS.get(hex_code.lower(), Fore.WHITE)
+    if not ANSI_COLORS:
+        _init_colors()
+    return ANSI_COLORS.get(hex_code.lower(), DEFAULT_COLOR)
     
 
-def print_schedule(weekly_schedule, tag_counts, tag_ranges, priorities, verbose):
-    tag_day_count = {tag: 0 for tag in priorities}  # Initialize day count for each tag
-    week_tags_count = []
+def print_schedule(weekly_schedule, tag_counts, tag_ranges, config, verbose, day_counts=None):
+    if day_counts is None:
+        day_counts = build_day_counts(weekly_schedule, config)
+
     for day, tasks in enumerate(weekly_schedule, start=1):
         task_strings = []
-        daily_tag_count = {tag: 0 for tag in priorities}  # Initialize daily tag count
-        
         for task in tasks:
-            color = get_color(priorities[task].get("color", "white"))
-            task_strings.append(f"{color}{task}{Style.RESET_ALL}")
-            daily_tag_count[task] += 1  # Count each occurrence of the task
-            
-        week_tags_count.append(daily_tag_count)    
-        
+            color = get_color(config.colors[task])
+            task_strings.append(f"{color}{config.labels[task]}{RESET_COLOR}")
         print(f"day {day}. {' '.join(task_strings)}")
-        
-        # Update the number of days each tag appears
-        for tag, count in daily_tag_count.items():
-            if count > 0:
-                tag_day_count[tag] += 1
 
         # Print daily tag counts
-        #for tag, count in daily_tag_count.items():
+        #for tag, count in day_counts[day - 1].items():
         #    if count > 0:  # Only print tags that are used that day
-        #        color = get_color(priorities[tag].get("color", "white"))
-        #        print(f"  {color}{tag}: {count} time(s) today{Style.RESET_ALL}")
-    
+        #        color = get_color(config.colors[tag])
+        #        print(f"  {color}{tag}: {count} time(s) today{RESET_COLOR}")
+
+    # Number of days each tag appears
+    tag_day_count = [sum(1 for counts in day_counts if counts[tag] > 0) for tag in range(len(config.labels))]
 
     if verbose:
         print("\nTag Counts and Ranges:")
-        for tag, count in tag_counts.items():
+        for tag in config.tag_ids:
+            count = tag_counts[tag]
             min_count, max_count = tag_ranges[tag]
-            color = get_color(priorities[tag].get("color", "white"))
-            weekly_amount = priorities[tag]["weekly-amount-days"]
-            daily_amount = priorities[tag]["daily-amount"]
-            tag_counts_str = ", ".join([str(tag_count[tag]) for tag_count in week_tags_count if tag_count[tag] > 0])
+            color = get_color(config.colors[tag])
+            tag_counts_str = ", ".join([str(tag_count[tag]) for tag_count in day_counts if tag_count[tag] > 0])
+            weekly_range = f"{config.weekly_min[tag]}-{config.weekly_max[tag]}"
+            daily_range = f"{config.daily_min[tag]}-{config.daily_max[tag]}"
 
-            
-            # Handle weekly amount range
-            if len(weekly_amount) > 1:
-                weekly_range = f"{weekly_amount[0]}-{weekly_amount[1]}"
-            else:
-                weekly_range = f"{weekly_amount[0]}-{weekly_amount[0]}"
-            
-            # Handle daily amount range
-            if len(daily_amount) > 1:
-                daily_range = f"{daily_amount[0]}-{daily_amount[1]}"
-            else:
-                daily_range = f"{daily_amount[0]}-{daily_amount[0]}"
-                
-            print(f"{color}{tag}: tag-sum:{min_count}-{max_count}(cur:{count}), "
+            print(f"{color}{config.labels[tag]}: tag-sum:{min_count}-{max_count}(cur:{count}), "
                   f"weekly-amount-days: {weekly_range}(cur:{tag_day_count[tag]}), "
-                  f"daily-amount: {daily_range}(cur:{tag_counts_str}){Style.RESET_ALL}")
+                  f"daily-amount: {daily_range}(cur:{tag_counts_str}){RESET_COLOR}")
 
             
             
-def run_interactive_mode(clr, verbose, priorities):
+def parse_target_load(config, value):
+    # '45' - total weekly load, '60%' - difficulty level in percents
+    value = value.strip()
+    if value.endswith('%'):
+        return get_target_load_for_difficulty(config, int(value[:-1]))
+    return int(value)
+
+
+def run_interactive_mode(clr, verbose, config, rng=random, target_load=None, best_of=None):
     print("Tag suggestion interactive mode running...")
-    weekly_schedule, tag_counts, tag_ranges = generate_schedule(priorities)
+    solution = None
+    if target_load is not None:
+        solution = solve_schedule(config, target_load, rng)
+    elif best_of:
+        solution = sample_best_schedule(config, best_of, rng)
+    if solution is None:
+        solution = generate_schedule(config, rng)
+    weekly_schedule, tag_counts, tag_ranges = solution
+    day_counts = build_day_counts(weekly_schedule, config)
     
     if clr:
         clear_console()
-    print_schedule(weekly_schedule, tag_counts, tag_ranges, priorities, verbose)
+    print_schedule(weekly_schedule, tag_counts, tag_ranges, config, verbose, day_counts)
     
     while True:
         user_input = input(
             """
 Enter your option:
-  'i' - to increase week difficulty;
-  'd' - to decrease week difficulty;
+  'i [n]' - to increase week difficulty (n times);
+  'd [n]' - to decrease week difficulty (n times);
   'r' - to regenerate week;
+  't load' - to build a week with the given total load in one step; Example: t 45 or t 60%
+  'b [count]' - to pick the best of count (10000 by default) random weeks;
   'c' - to continue;
   'e' - to exit/abort;
 """
         ).strip().lower()
-        if user_input == "i":
-            weekly_schedule, tag_counts = adjust_schedule(weekly_schedule, tag_counts, tag_ranges, priorities, easier=False)
-        elif user_input == "d":
-            weekly_schedule, tag_counts = adjust_schedule(weekly_schedule, tag_counts, tag_ranges, priorities, easier=True)
+        command, _, steps = user_input.partition(" ")
+        if command in ("i", "d") and (not steps or steps.strip().isdigit()):
+            # Apply n adjustments in one go, stop as soon as nothing can be adjusted anymore
+            for _ in range(int(steps) if steps else 1):
+                total = sum(tag_counts)
+                adjust_schedule(weekly_schedule, tag_counts, tag_ranges, config, easier=(command == "d"), rng=rng, day_counts=day_counts)
+                if sum(tag_counts) == total:
+                    break
         elif user_input == "r":
-            weekly_schedule, tag_counts, tag_ranges = generate_schedule(priorities)
+            weekly_schedule, tag_counts, tag_ranges = generate_schedule(config, rng)
+            day_counts = build_day_counts(weekly_schedule, config)
+        elif user_input.startswith("t "):
+            try:
+                solution = solve_schedule(config, parse_target_load(config, user_input[2:]), rng)
+            except ValueError:
+                print("Invalid target load. Example: t 45 or t 60%")
+                solution = None
+            if solution is not None:
+                weekly_schedule, tag_counts, tag_ranges = solution
+                day_counts = build_day_counts(weekly_schedule, config)
+        elif user_input == "b" or user_input.startswith("b "):
+            count = user_input[1:].strip()
+            if count.isdigit() and int(count) > 0:
+                weekly_schedule, tag_counts, tag_ranges = sample_best_schedule(config, int(count), rng)
+                day_counts = build_day_counts(weekly_schedule, config)
+            elif not count:
+                weekly_schedule, tag_counts, tag_ranges = sample_best_schedule(config, rng=rng)
+                day_counts = build_day_counts(weekly_schedule, config)
+            else:
+                print("Invalid count. Example: b 5000")
         elif user_input == "e":
             print("Aborting...")
             sys.exit()
         elif user_input == "c":
             break
         else:
-            print("Invalid input. Please enter 'i', 'd', 'r', or 'c'.")
+            print("Invalid input. Please enter 'i', 'd', 'r', 't load', 'b' or 'c'.")
         
         if clr:
             clear_console()
-        print_schedule(weekly_schedule, tag_counts, tag_ranges, priorities, verbose)
+        print_schedule(weekly_schedule, tag_counts, tag_ranges, config, verbose, day_counts)
         
     return weekly_schedule, tag_counts, tag_ranges 
             
@@ -252,16 +414,35 @@ def main():
     parser.add_argument("--cfg", help="Path to the task configuration JSON file")
     parser.add_argument("--clr", action="store_true", help="Clear console before displaying the schedule")
     parser.add_argument("--verbose", action="store_true", help="Provide more verbose output")
+    parser.add_argument("--seed", type=int, help="Seed of the random generator, a random seed is used if not specified")
+    parser.add_argument("--best-of", type=int, help="Start with the best of this many random weeks (requires numpy)")
+    parser.add_argument("--target-load", help="Build the week with this total load (e.g. 45) or difficulty level (e.g. 60%%) instead of a random one")
 
     args = parser.parse_args()
 
+    if args.best_of is not None and args.best_of < 1:
+        print("Error: --best-of must be at least 1.")
+        sys.exit(1)
     try:
-        priorities = load_configuration(args.cfg)
+        config = task_configuration.load_configuration(args.cfg)
     except FileNotFoundError:
         print(f"Error: The file {args.cfg} does not exist.")
         sys.exit(1)
+    except task_configuration.ConfigurationError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
-    run_interactive_mode(args.clr, args.verbose, priorities)
+    seed = args.seed if args.seed is not None else seeding.new_seed()
+    print(f"Seed: {seed}")
+    tag_rng, _ = seeding.make_stage_rngs(seed)
+    target_load = None
+    if args.target_load:
+        try:
+            target_load = parse_target_load(config, args.target_load)
+        except ValueError:
+            print(f"Error: '{args.target_load}' is not a valid target load.")
+            sys.exit(1)
+    run_interactive_mode(args.clr, args.verbose, config, tag_rng, target_load, args.best_of)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,155 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+
+import task_loader
+
+# Bump when the layout of the cached task records changes
+CACHE_VERSION = 4
+
+
+def get_user_cache_dir():
+    # week-organizer directory of the user's own cache directory (created with mode 0700 by its writers)
+    if os.name == 'nt':
+        cache_dir = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_dir, "week-organizer")
+
+
+def get_default_cache_path(tasks_dir):
+    # Kept in the user's own cache directory, not in tasks-dir: the tasks directory may be a shared drive, and
+    # the cache must not be something other users can hand to the planner. One file per tasks directory.
+    digest = hashlib.blake2b(os.path.abspath(tasks_dir).encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(get_user_cache_dir(), f"tasks-{digest}.json")
+
+
+def _task_to_fields(task):
+    return [task.tag, task.task, task.description, task.priority, task.min_days, task.max_days, task.remarks,
+            task.prompt, task.file]
+
+
+def _task_from_fields(fields):
+    tag, task, description, priority, min_days, max_days, remarks, prompt, file = fields
+    return task_loader.Task(int(tag), str(task), str(description), float(priority), int(min_days), int(max_days),
+                            str(remarks), str(prompt), str(file))
+
+
+# On-disk snapshot of the parsed and validated task files, stored as plain JSON (a damaged or foreign cache file
+# is ignored, it can't run code like a pickle could).
+# Every file entry is keyed by its path and remembers mtime, size and content hash of the file it was parsed from:
+# - same mtime and size: the file isn't read at all
+# - different mtime or size but the same content hash: the file is read but not parsed
+# - otherwise the file is parsed again and the entry is replaced
+class TaskCache:
+    def __init__(self, path, rebuild=False):
+        self.path = path
+        self.entries = {}
+        self.seen = set()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        # load_file can be called from the loader thread pool
+        self.lock = threading.Lock()
+        if not rebuild:
+            self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            if data.get('version') != CACHE_VERSION:
+                return
+            entries = {}
+            for key, entry in data['entries'].items():
+                entries[key] = {
+                    'mtime': int(entry['mtime']),
+                    'size': int(entry['size']),
+                    'hash': bytes.fromhex(entry['hash']),
+                    'tasks': [_task_from_fields(fields) for fields in entry['tasks']],
+                    'errors': [task_loader.LoadError(str(file), int(row), str(message))
+                               for file, row, message in entry['errors']],
+                }
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return
+        self.entries = entries
+
+    def save(self):
+        # Forget files which disappeared from the tasks directory
+        for key in list(self.entries):
+            if key not in self.seen:
+                del self.entries[key]
+                self.dirty = True
+        if not self.dirty:
+            return
+        data = {
+            'version': CACHE_VERSION,
+            'entries': {key: {
+                'mtime': entry['mtime'],
+                'size': entry['size'],
+                'hash': entry['hash'].hex(),
+                'tasks': [_task_to_fields(task) for task in entry['tasks']],
+                'errors': [list(error) for error in entry['errors']],
+            } for key, entry in self.entries.items()},
+        }
+        temp_path = self.path + ".tmp"
+        try:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+            with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Warning: can't write task cache {self.path}: {e}")
+
+    def load_file(self, file_path):
+        key = os.path.abspath(file_path)
+        file_name = os.path.basename(file_path)
+        with self.lock:
+            self.seen.add(key)
+            entry = self.entries.get(key)
+        try:
+            stat = os.stat(file_path)
+            if entry is not None and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                with self.lock:
+                    self.hits += 1
+                return entry['tasks'], entry['errors']
+
+            with open(file_path, 'rb') as file:
+                data = file.read()
+        except OSError as e:
+            return [], [task_loader.LoadError(file_name, 0, f"Can't read CSV file: {e}")]
+
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if entry is not None and entry['hash'] == digest:
+            with self.lock:
+                entry['mtime'] = stat.st_mtime_ns
+                entry['size'] = stat.st_size
+                self.dirty = True
+                self.hits += 1
+            return entry['tasks'], entry['errors']
+
+        with self.lock:
+            self.misses += 1
+        try:
+            tasks, errors = task_loader.parse_tasks(io.StringIO(data.decode('utf-8'), newline=''), file_name)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Not cached, the file will be checked again on the next run
+            return [], [task_loader.LoadError(file_name, 0, f"Can't read CSV file: {e}")]
+        with self.lock:
+            self.entries[key] = {
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'hash': digest,
+                'tasks': tasks,
+                'errors': errors,
+            }
+            self.dirty = True
+        return tasks, errors
+
+    def get_stats_line(self):
+        return f"Task cache: {self.hits} hits, {self.misses} misses ({self.path})"
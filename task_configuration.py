@@ -0,0 +1,145 @@
+import csv
+import json
+import math
+import numbers
+
+from task_loader import TAG_IDS, available_tags
+
+
+class ConfigurationError(Exception):
+    pass
+
+
+# task-configuration.json compiled once: validated, with the tag settings in dense lists indexed by tag id
+# (task_loader.TAG_IDS, the ids of the task records). The stages work with tag ids only: schedules are lists of
+# tag ids per day, tag counts and ranges are lists indexed by tag id. tag_ids keeps the configuration order,
+# every stage iterates the tags in this order (it decides the sequence of random draws).
+# Tag keys are normalized: "#HLT", "HLT" and "hlt" are the same tag.
+class Configuration:
+    def __init__(self, data, path="configuration"):
+        self.path = path
+        if not isinstance(data, dict):
+            raise ConfigurationError(f"{path}: the configuration must be a JSON object")
+        self.tasks_dir = _get_field(data, "tasks-dir", str, path)
+        self.stash_dir = data.get("stash-dir")
+        if self.stash_dir is not None and not isinstance(self.stash_dir, str):
+            raise ConfigurationError(f"{path}: 'stash-dir' must be a string")
+
+        size = len(available_tags)
+        self.tag_ids = []
+        self.labels = ["#" + tag for tag in available_tags]  # '#HLT', as shown in the schedules
+        self.descriptions = [""] * size
+        self.sorting_index = [0] * size
+        self.weekly_amount_days = [()] * size  # options of the amount of days in the week
+        self.weekly_min = [0] * size
+        self.weekly_max = [0] * size
+        self.daily_min = [0] * size
+        self.daily_max = [0] * size
+        self.pickup_priority = [0.0] * size
+        self.colors = ["white"] * size
+        self.tag_ranges = [(0, 0)] * size  # smallest and largest weekly total of the tag
+
+        tag_distribution = _get_field(data, "tag-distribution", dict, path)
+        daily_priorities = _get_field(tag_distribution, "daily-priorities", dict, f"{path}: tag-distribution")
+        if not daily_priorities:
+            raise ConfigurationError(f"{path}: tag-distribution.daily-priorities is empty")
+        for key, tag in daily_priorities.items():
+            self._add_tag(key, tag)
+
+        permanent_tasks = data.get("permanent-tasks", {})
+        if not isinstance(permanent_tasks, dict):
+            raise ConfigurationError(f"{path}: permanent-tasks must be an object")
+        for day_key, entries in permanent_tasks.items():
+            if day_key not in ("1", "2", "3", "4", "5", "6", "7"):
+                raise ConfigurationError(f"{path}: permanent-tasks key '{day_key}' must be a day number 1-7")
+            if not isinstance(entries, list) or not all(isinstance(entry, str) for entry in entries):
+                raise ConfigurationError(f"{path}: permanent-tasks.{day_key} must be a list of CSV strings")
+        # Parse the permanent task templates once instead of on every save
+        self.permanent_tasks = compile_permanent_tasks(permanent_tasks, f"{path}: permanent-tasks")
+
+    def _add_tag(self, key, tag):
+        name = key.strip().lstrip('#').upper()
+        where = f"{self.path}: daily-priorities.{key}"
+        if name not in TAG_IDS:
+            raise ConfigurationError(f"{where}: unknown tag, available tags: {', '.join(available_tags)}")
+        tag_id = TAG_IDS[name]
+        if tag_id in self.tag_ids:
+            raise ConfigurationError(f"{where}: the tag is configured twice")
+        if not isinstance(tag, dict):
+            raise ConfigurationError(f"{where}: must be an object")
+
+        weekly_amount_days = _get_amount_range(tag, "weekly-amount-days", where, 7)
+        daily_amount = _get_amount_range(tag, "daily-amount", where)
+        self.tag_ids.append(tag_id)
+        self.weekly_amount_days[tag_id] = tuple(weekly_amount_days)
+        self.weekly_min[tag_id], self.weekly_max[tag_id] = weekly_amount_days[0], weekly_amount_days[-1]
+        self.daily_min[tag_id], self.daily_max[tag_id] = daily_amount[0], daily_amount[-1]
+        self.tag_ranges[tag_id] = (self.weekly_min[tag_id] * self.daily_min[tag_id],
+                                   self.weekly_max[tag_id] * self.daily_max[tag_id])
+        self.sorting_index[tag_id] = _get_field(tag, "sorting-index", numbers.Real, where)
+        priority = tag.get("pick-up-priority", 1.0)
+        if (not isinstance(priority, numbers.Real) or isinstance(priority, bool) or not math.isfinite(priority)
+                or priority < 0):
+            raise ConfigurationError(f"{where}: 'pick-up-priority' must be a non negative number")
+        self.pickup_priority[tag_id] = float(priority)
+        self.colors[tag_id] = _get_string(tag, "color", "white", where)
+        self.descriptions[tag_id] = _get_string(tag, "description", "", where)
+
+    def get_tag_id(self, key):
+        # '#HLT' / 'HLT' -> tag id, None for an unknown or not configured tag
+        tag_id = TAG_IDS.get(key.strip().lstrip('#').upper())
+        return tag_id if tag_id in self.tag_ids else None
+
+
+def _get_field(data, field, field_type, where):
+    value = data.get(field)
+    if not isinstance(value, field_type) or isinstance(value, bool):
+        raise ConfigurationError(f"{where}: '{field}' is missing or isn't a {getattr(field_type, '__name__', field_type)}")
+    return value
+
+
+def _get_string(data, field, default, where):
+    value = data.get(field, default)
+    if not isinstance(value, str):
+        raise ConfigurationError(f"{where}: '{field}' must be a string")
+    return value
+
+
+def _get_amount_range(tag, field, where, maximum=None):
+    # [n] or [min, max] of non negative ints, at most maximum
+    value = tag.get(field)
+    if (not isinstance(value, list) or len(value) not in (1, 2)
+            or not all(isinstance(amount, int) and not isinstance(amount, bool) and amount >= 0 for amount in value)):
+        raise ConfigurationError(f"{where}: '{field}' must be [n] or [min, max] of non negative integers")
+    if value[0] > value[-1]:
+        raise ConfigurationError(f"{where}: '{field}' minimum is greater than the maximum")
+    if maximum is not None and value[-1] > maximum:
+        raise ConfigurationError(f"{where}: '{field}' can't be greater than {maximum}")
+    return value
+
+
+# "permanent-tasks" of the configuration, compiled once at config load:
+# day index (1..7) -> list of (csv fields of the entry, indices of the fields containing $DATE)
+def compile_permanent_tasks(permanent_tasks, where="permanent-tasks"):
+    # Raises ConfigurationError for a malformed entry (unterminated quote, text after a closing quote)
+    compiled = {}
+    for day_key, entries in permanent_tasks.items():
+        templates = []
+        for entry in entries:
+            try:
+                fields = tuple(next(csv.reader([entry], skipinitialspace=True, strict=True)))
+            except csv.Error as e:
+                raise ConfigurationError(f"{where}.{day_key}: malformed entry '{entry}': {e}") from e
+            templates.append((fields, tuple(i for i, field in enumerate(fields) if "$DATE" in field)))
+        compiled[int(day_key)] = templates
+    return compiled
+
+
+def load_configuration(file_path):
+    # Raises FileNotFoundError or ConfigurationError
+    with open(file_path, 'r') as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ConfigurationError(f"{file_path}: invalid JSON: {e}") from e
+    return Configuration(data, file_path)
@@ -0,0 +1,125 @@
+import os
+from collections import namedtuple
+
+import instrumentation
+
+# Enrichment stage: answers the 'prompt' column of the tasks picked for the plan with an OpenAI compatible
+# chat completions API. All the prompts of the plan are sent concurrently (at most concurrency requests at a time)
+# over one AsyncOpenAI client; the client handles the timeouts and retries.
+# The answers are returned as prompt -> answer and written to the remarks by save_distribution_to_csv,
+# the task records themselves are never modified (they are shared by the task pool).
+# openai is an optional dependency; it, asyncio and sqlite3 (llm_cache) are imported only when the stage runs.
+# Use llm_stub_server.py as the base url to run the stage offline.
+# With a cache path the answers are kept in an llm_cache.LlmCache, only the prompts it doesn't know are sent.
+
+# The answers are cached by model, system message, prompt and sampling parameters: chatgpt.py uses these too
+DEFAULT_MODEL = "gpt-3.5-turbo"
+SYSTEM_MESSAGE = "You are a helpful assistant. You provide short and precise information."
+TEMPERATURE = 0.7
+DEFAULT_CACHE_PATH = ".llm-cache.sqlite"
+
+EnrichmentSettings = namedtuple('EnrichmentSettings', 'base_url api_key model concurrency timeout retries max_tokens '
+                                                      'cache_path cache_ttl cache_size')
+
+
+def make_settings(base_url=None, api_key_file=None, model=DEFAULT_MODEL, concurrency=8, timeout=30.0, retries=2,
+                  max_tokens=150, cache_path=None, cache_ttl=30 * 24 * 3600, cache_size=10000):
+    # API key: the key file if given, OPENAI_API_KEY otherwise. A local stub server doesn't check the key
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if api_key_file:
+        with open(api_key_file, 'r') as file:
+            api_key = file.read().strip()
+    return EnrichmentSettings(base_url, api_key or "no-key", model, max(1, concurrency), timeout, retries, max_tokens,
+                              cache_path, cache_ttl, cache_size)
+
+
+def get_sampling_params(settings):
+    return {"max_tokens": settings.max_tokens, "temperature": TEMPERATURE}
+
+
+def collect_prompts(distribution):
+    # Unique prompts of the tasks of the distribution, in plan order
+    prompts = {}
+    for day in distribution:
+        for task in day["tasks"]:
+            if task is not None and task.prompt:
+                prompts[task.prompt] = None
+    return list(prompts)
+
+
+async def _ask(client, semaphore, prompt, settings):
+    async with semaphore:
+        try:
+            chat_completion = await client.chat.completions.create(
+                model=settings.model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_MESSAGE},
+                    {"role": "user", "content": prompt},
+                ],
+                **get_sampling_params(settings),
+            )
+        except Exception as e:
+            print(f"Can't get an answer to '{prompt}': {e}")
+            instrumentation.count("llm-failures")
+            return None
+        instrumentation.count("llm-answers")
+        return (chat_completion.choices[0].message.content or "").strip() or None
+
+
+async def fetch_answers(prompts, settings):
+    import asyncio
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(api_key=settings.api_key, base_url=settings.base_url, timeout=settings.timeout,
+                         max_retries=settings.retries)
+    semaphore = asyncio.Semaphore(settings.concurrency)
+    try:
+        answers = await asyncio.gather(*(_ask(client, semaphore, prompt, settings) for prompt in prompts))
+    finally:
+        await client.close()
+    return {prompt: answer for prompt, answer in zip(prompts, answers) if answer is not None}
+
+
+@instrumentation.timed("llm-enrichment")
+def enrich_distribution(distribution, settings):
+    # prompt -> answer for the prompts of the distribution which got an answer
+    import asyncio
+    from llm_cache import LlmCache
+
+    prompts = collect_prompts(distribution)
+    if not prompts:
+        return {}
+
+    answers = {}
+    cache = None
+    if settings.cache_path:
+        cache = LlmCache(settings.cache_path, settings.cache_ttl, settings.cache_size)
+        params = get_sampling_params(settings)
+        keys = {prompt: cache.make_key(settings.model, SYSTEM_MESSAGE, prompt, params) for prompt in prompts}
+        for prompt in prompts:
+            answer = cache.get(keys[prompt])
+            if answer is not None:
+                answers[prompt] = answer
+        # get() updates the entries, release the lock before the prompts are sent
+        cache.commit()
+        prompts = [prompt for prompt in prompts if prompt not in answers]
+
+    try:
+        if prompts:
+            print(f"Asking {len(prompts)} task prompt(s)...")
+            try:
+                fetched = asyncio.run(fetch_answers(prompts, settings))
+            except ImportError:
+                print("Task prompts are not answered: the openai package is not installed (pip install openai)")
+                fetched = {}
+            answers.update(fetched)
+            if cache is not None:
+                for prompt, answer in fetched.items():
+                    cache.put(keys[prompt], answer)
+    finally:
+        if cache is not None:
+            instrumentation.count("llm-cache-hits", cache.hits)
+            instrumentation.count("llm-cache-misses", cache.misses)
+            print(cache.get_stats_line())
+            cache.close()
+    return answers
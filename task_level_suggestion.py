@@ -1,32 +1,27 @@
 import csv
+import os
 import random
 from datetime import datetime, timedelta
-from tag_level_suggestion import get_color  # Import the get_color function
-from colorama import Style
-import copy
-import io
+from tag_level_suggestion import get_color, RESET_COLOR
+from task_loader import available_tags, format_error
+from task_pool import get_task_key
+import instrumentation
+import plan_history
+import task_enrichment
+import task_store
+import task_watcher
+from collections import deque
 
 # pseudo json representation of week_distribution structure
 # week_distribution = [
 #  ### Day 1
 #  { 
 #      "date" : "18-Jun-2024 Tuesday",
-#      "tags" : ["HLT", "HLT", "TODO"],
+#      "tags" : [2, 2, 0],  # tag ids (task_loader.TAG_IDS): HLT, HLT, TODO
 #      "tasks" : [
-#          {
-#               "name" : "task name",
-#               "description" : "task description",
-#               "status" : "new",                
-#               "tag" : "HLT",
-#               "remarks" : "",
-#               "summary" : ""
-#          },
-#          {
-#               ... # another task of day 1 HLT
-#          },
-#          {
-#               ... # another task of day 1 TODO
-#          },
+#          Task(...),  # task_loader.Task record of day 1 HLT (the same record for every day of the task)
+#          Task(...),  # another task of day 1 HLT
+#          None,       # no task found for day 1 TODO, a generic task is written for it
 #      ]
 #   },
 #   ### Day 2
@@ -36,11 +31,18 @@ import io
 
 
 class WeekDistribution:
-    def __init__(self, weekly_schedule, start_date, verbose):
+    # config - task_configuration.Configuration
+    # weekly_schedule - tag ids of every day; may cover several weeks (see tag_level_suggestion.merge_schedules),
+    # a task then can continue into the next week and is never picked twice in the horizon
+    def __init__(self, config, weekly_schedule, start_date, verbose, rng=random):
+        self.config = config
         self.start_date = datetime.strptime(start_date, "%d-%b-%Y")
         self.verbose = verbose
-        self.week_distribution = self._initialize_week_distribution(weekly_schedule)        
-        
+        self.rng = rng
+        self.free_slots = []  # tag id -> queue of free (day index, slot index) positions in week order
+        self.task_slots = {}  # assigned task -> its (day index, slot index) positions in week order
+        self.week_distribution = self._initialize_week_distribution(weekly_schedule)
+
     def _initialize_week_distribution(self, weekly_schedule):
         week_distribution = []
         for day_offset, tags in enumerate(weekly_schedule):
@@ -49,36 +51,67 @@ class WeekDistribution:
             date_string = f"{current_date.strftime('%d-%b-%Y')} {day_of_week}"
             week_distribution.append({
                 "date": date_string,
-                "tags": [tag[1:] for tag in tags],  # Remove '#' from tags
+                "tags": list(tags),
                 "tasks": [None] * len(tags)  # Initialize with empty tasks                
             })
-           
+
+        self._reset_free_slots(week_distribution)
         return week_distribution
-    
+
+    def _reset_free_slots(self, week_distribution):
+        self.free_slots = [deque() for _ in available_tags]
+        for day_index, day in enumerate(week_distribution):
+            for slot_index, tag in enumerate(day["tags"]):
+                if day["tasks"][slot_index] is None:
+                    self.free_slots[tag].append((day_index, slot_index))
+
+    def _assign_slot(self, assigned_task, tag):
+        # Take the first free slot of the tag in week order
+        day_index, slot_index = self.free_slots[tag].popleft()
+        self.week_distribution[day_index]["tasks"][slot_index] = assigned_task
+        self.task_slots.setdefault(assigned_task, []).append((day_index, slot_index))
+
     def get_distribution(self):
         return self.week_distribution
 
+    def get_task_keys(self, file_name):
+        # get_task_key() of the placed tasks loaded from file_name (Task.file)
+        return {get_task_key(task) for task in self.task_slots if task.file == file_name}
+
+    def replace_tasks(self, tasks):
+        # Move the placed tasks to their reloaded records (same file and get_task_key)
+        new_records = {(task.file, get_task_key(task)): task for task in tasks}
+        for old_task in list(self.task_slots):
+            new_task = new_records.get((old_task.file, get_task_key(old_task)))
+            if new_task is None or new_task is old_task:
+                continue
+            slots = self.task_slots.pop(old_task)
+            for day_index, slot_index in slots:
+                self.week_distribution[day_index]["tasks"][slot_index] = new_task
+            # Duplicated rows of a task get one record
+            self.task_slots[new_task] = sorted(self.task_slots.get(new_task, []) + slots)
+
 
-    def get_next_random_task(self, tasks, tag, max_slots_count):
-        filtered_tasks = [t for t in tasks if t['tag'] == tag and get_min_max_days_from_range_string(t['days'])[0]
-                          <= max_slots_count]
-        if not filtered_tasks:
-            print(f"Can't find task {tag} for {max_slots_count} available slots")
+    def get_next_random_task(self, task_pool, tag, max_slots_count):
+        # Select a task based on the pickup-priority weights, the task is removed from the pool
+        selected_task = task_pool.pick(tag, max_slots_count, self.rng)
+        if selected_task is None:
+            print(f"Can't find task {available_tags[tag]} for {max_slots_count} available slots")
+            instrumentation.count("failed-picks")
             return None, 0
-        weights = [float(t.get('pickup-priority', 0)) for t in filtered_tasks]
-        # Select a task based on the weights
-        selected_task = random.choices(filtered_tasks, weights=weights, k=1)[0]
-        tasks.remove(selected_task)
-        min_days, max_days = get_min_max_days_from_range_string(selected_task['days'])
-        task_days = random.randint(min_days, min(max_days, max_slots_count))
+        instrumentation.count("picks")
+        task_days = self.rng.randint(selected_task.min_days, min(selected_task.max_days, max_slots_count))
         return selected_task, task_days
 
-    def distribute_tasks(self, tasks_db_origin, tag_counts):
+    @instrumentation.timed("task-distribution")
+    def distribute_tasks(self, task_pool, tag_counts):
         """
         Algorithm Description:
-        1. Make a deep copy of the original tasks database to avoid modifying the original data.
-        2. Create a dictionary of available slots by removing the first character from each tag in tag_counts.
-        3. For each tag in available slots:
+        1. Put the tasks picked by the previous distribution back to the task pool (indexed by tag, bucketed by
+           minimum days) and clear the week. Picked tasks are removed from the pool only, the loaded records
+           are never copied or modified.
+        2. Take the amount of slots of every tag from tag_counts (indexed by tag id).
+        3. For each tag in configuration order:
            a. While there are available slots for the tag:
               i. Get the next random task that fits within the available slots.
               ii. If no task is found, break the loop and add the tag to the "can't distribute" list.
@@ -86,90 +119,134 @@ class WeekDistribution:
               iv. Reduce the count of available slots by the number of days assigned to the task.
         4. Distribute the assigned tasks across the week_distribution:
            a. For each assigned task and its days:
-              i. Iterate through each day in the week_distribution.
-              ii. For each slot in the day:
-                 - If the slot matches the task's tag and is empty:
-                   1. Assign the task to the slot.
-                   2. Reduce the number of days remaining for the task.
-                   3. Break the loop if all days are assigned.
-              iii. Move to the next day if there are still days remaining for the task.
-        5. If no slots are available, extend already allocated tasks if they haven't reached their maximum days.
+              i. Take the first free slot of the task's tag (in day and slot order) from the per-tag free slot queue.
+              ii. Assign the task to the slot and reduce the number of days remaining for the task.
+              iii. Repeat while there are days remaining for the task and free slots of the tag.
+        5. If no task can be found for the remaining slots of a tag, extend the tasks already allocated to this tag
+           into its free slots (in week order) while they haven't reached their maximum days. A running counter of
+           the days used by every assigned task keeps the pass linear.
         """
-        tasks_db = copy.deepcopy(tasks_db_origin)
-        available_slots = {tag[1:]: count for tag, count in tag_counts.items()}
+        task_pool.reset()
+        for day in self.week_distribution:
+            day["tasks"] = [None] * len(day["tags"])
+        self.task_slots = {}
+        self._reset_free_slots(self.week_distribution)
+        assigned_tasks, cant_distribute_tasks = self._pick_tasks(task_pool, tag_counts)
+        days_used, assigned_by_tag = self._place_tasks(assigned_tasks)
+        self._extend_tasks(assigned_tasks, cant_distribute_tasks, days_used, assigned_by_tag)
+
+    @instrumentation.timed("task-regeneration")
+    def regenerate_slot(self, task_pool, day_index, slot_index, all_days=True):
+        # Replace the task of the slot with new tasks of the same tag, on all of its days (all_days) or on this day
+        # only, or the generic task of an empty slot; the rest of the distribution stays as it is. If the pool runs
+        # out before the slots are filled, the new tasks are extended up to their max_days and the old task keeps
+        # the slots which are still left. The old task goes back to the pool once it has no slots left, after the
+        # replacements are drawn, so it can't be drawn again. Costs O(slots of the task * log n).
+        # Returns the new tasks, empty if no other task of the tag fits (the old task keeps its slots then).
+        day = self.week_distribution[day_index]
+        tag = day["tags"][slot_index]
+        old_task = day["tasks"][slot_index]
+        if old_task is not None and all_days:
+            slots = self.task_slots.pop(old_task)
+        else:
+            slots = [(day_index, slot_index)]
+            if old_task is not None:
+                self.task_slots[old_task].remove((day_index, slot_index))
+                if not self.task_slots[old_task]:
+                    del self.task_slots[old_task]
+        for slot_day_index, slot_slot_index in slots:
+            self.week_distribution[slot_day_index]["tasks"][slot_slot_index] = None
+
+        new_tasks = []  # [task, days]
+        remaining = len(slots)
+        while remaining > 0:
+            selected_task, task_days = self.get_next_random_task(task_pool, tag, remaining)
+            if selected_task is None:
+                break
+            new_tasks.append([selected_task, task_days])
+            remaining -= task_days
+        for entry in new_tasks:
+            extension = min(remaining, entry[0].max_days - entry[1])
+            entry[1] += extension
+            remaining -= extension
 
+        position = 0
+        for selected_task, task_days in new_tasks:
+            task_slots = slots[position:position + task_days]
+            for slot_day_index, slot_slot_index in task_slots:
+                self.week_distribution[slot_day_index]["tasks"][slot_slot_index] = selected_task
+            self.task_slots[selected_task] = task_slots
+            position += task_days
+
+        if old_task is not None:
+            left_slots = slots[position:]
+            if left_slots:
+                # Nothing to replace it with on these days: the old task stays there
+                for slot_day_index, slot_slot_index in left_slots:
+                    self.week_distribution[slot_day_index]["tasks"][slot_slot_index] = old_task
+                self.task_slots[old_task] = sorted(self.task_slots.get(old_task, []) + left_slots)
+            elif old_task not in self.task_slots:
+                task_pool.put_back(old_task)
+        return [selected_task for selected_task, _ in new_tasks]
+
+    @instrumentation.timed("task-picking")
+    def _pick_tasks(self, task_pool, tag_counts):
         assigned_tasks = []
         cant_distribute_tasks = []
 
         # Step 3: Assign tasks initially
-        for tag, count in available_slots.items():
+        for tag in self.config.tag_ids:
+            count = tag_counts[tag]
             while count > 0:
-                selected_task, task_days = self.get_next_random_task(tasks_db, tag, count)
+                selected_task, task_days = self.get_next_random_task(task_pool, tag, count)
                 if selected_task is None:
                     cant_distribute_tasks.append((tag, count))
                     break
                 assigned_tasks.append((selected_task, task_days))
                 count -= task_days
 
+        return assigned_tasks, cant_distribute_tasks
+
+    @instrumentation.timed("task-placement")
+    def _place_tasks(self, assigned_tasks):
         # Step 4: Distribute assigned tasks to week_distribution
-        for assigned_task, task_days in assigned_tasks:
-            for day in self.week_distribution:
-                for i, tag in enumerate(day["tags"]):
-                    if assigned_task['tag'] == tag and task_days > 0 and day["tasks"][i] is None:
-                        wtask = {
-                            "name": assigned_task["task"],
-                            "description": assigned_task["description"],
-                            "status": "new",
-                            "tag": assigned_task["tag"],
-                            "remarks": assigned_task["remarks"] + " " + assigned_task["prompt"],
-                            "summary": "",
-                        }
-                        day["tasks"][i] = wtask
-                        task_days -= 1
-                        if task_days == 0:
-                            break
-                if task_days == 0:
-                    break
+        days_used = []  # number of slots taken by every assigned task
+        assigned_by_tag = {}  # tag id -> indices of the assigned tasks
+        for task_index, (assigned_task, task_days) in enumerate(assigned_tasks):
+            tag = assigned_task.tag
+            free_slots = self.free_slots[tag]
+            used = 0
+            while used < task_days and free_slots:
+                self._assign_slot(assigned_task, tag)
+                used += 1
+            days_used.append(used)
+            assigned_by_tag.setdefault(tag, []).append(task_index)
 
         # for day in self.week_distribution:
         #     for task in day["tasks"]:
         #         if task is not None:
-        #             print(f"Assigned Task: {task['name']} for {task['tag']}")
+        #             print(f"Assigned Task: {task.task} for {task.tag_name}")
         #         else:
         #             print("none")
 
+        return days_used, assigned_by_tag
+
+    @instrumentation.timed("task-extension")
+    def _extend_tasks(self, assigned_tasks, cant_distribute_tasks, days_used, assigned_by_tag):
         # Step 5: Extend already allocated tasks if no new slots available
         for tag, remaining_count in cant_distribute_tasks:
-            for assigned_task, _ in assigned_tasks:
-                if assigned_task['tag'] == tag:
-                    min_days, max_days = get_min_max_days_from_range_string(assigned_task['days'])
-                    for day in self.week_distribution:
-                        for i, task in enumerate(day["tasks"]):
-                            if task and task["tag"] == assigned_task["tag"] and task["name"] == assigned_task["task"]:
-                                current_days = sum(
-                                    sum(1 for t in d["tasks"] if
-                                        isinstance(t, dict) and t.get("name") == assigned_task.get("name"))
-                                    for d in self.week_distribution
-                                )
-                                if current_days < max_days and remaining_count > 0:
-                                    # Find the first empty slot in the entire week to extend the task
-                                    found_empty_slot = False
-                                    for d in self.week_distribution:
-                                        for j, slot in enumerate(d["tasks"]):
-                                            if slot is None:
-                                                print(f"Extending {task} to day {d['date']}: +1")
-                                                d["tasks"][j] = task  # Assign task to the empty slot
-                                                remaining_count -= 1
-                                                found_empty_slot = True
-                                                break
-                                        if found_empty_slot:
-                                            break
-                                if remaining_count == 0:
-                                    break
-                        if remaining_count == 0:
-                            break
-                    if remaining_count == 0:
-                        break
+            free_slots = self.free_slots[tag]
+            for task_index in assigned_by_tag.get(tag, ()):
+                if not (remaining_count > 0 and free_slots):
+                    break
+                assigned_task = assigned_tasks[task_index][0]
+                while days_used[task_index] < assigned_task.max_days and remaining_count > 0 and free_slots:
+                    day_index, _ = free_slots[0]
+                    print(f"Extending {assigned_task.task} to day {self.week_distribution[day_index]['date']}: +1")
+                    self._assign_slot(assigned_task, tag)
+                    instrumentation.count("extensions")
+                    days_used[task_index] += 1
+                    remaining_count -= 1
 
 
 def sanitize_value(value):
@@ -181,122 +258,164 @@ def sanitize_value(value):
         print("Error: value isn't a string")
         return value
         
-def get_min_max_days_from_range_string(ranged_string):
-    if '-' in ranged_string:
-        min_days, max_days = map(int, ranged_string.split('-'))
-    else:
-        min_days = max_days = int(ranged_string)
-    return min_days, max_days
-
-def print_distribution(distribution, weekly_tag_schedule, priorities):
+def print_distribution(distribution, config):
     for day_index, day in enumerate(distribution):
+        if day_index % 7 == 0 and len(distribution) > 7:
+            print(f"\n=== Week {day_index // 7 + 1} ===")
         print(f"\n{day_index + 1}. {day['date']}")
         for task_index, task in enumerate(day['tasks']):
+            tag = day['tags'][task_index]
+            label = config.labels[tag]
+            color = get_color(config.colors[tag])
+
             if task is None:
-                tag = weekly_tag_schedule[day_index][task_index]
-                tag = tag[1:]
-                task = replaceNoneTaskWithGeneric(task, tag)
-            
-            tag = '#'+task["tag"]
-            color = get_color(priorities[tag].get("color", "white"))
-            
-            task_name = task["name"]
-            task_description = task["description"]
+                task_name, task_description = get_generic_task(available_tags[tag])
+            else:
+                task_name, task_description = task.task, task.description
+
             if len(task_description) > 0:
-                print(f"  {task_index + 1}. {color}{tag}:{task_name} = {task_description}{Style.RESET_ALL}")
+                print(f"  {task_index + 1}. {color}{label}:{task_name} = {task_description}{RESET_COLOR}")
             else:
-                print(f"  {task_index + 1}. {color}{tag}:{task_name}{Style.RESET_ALL}")
-
-def replaceNoneTaskWithGeneric(task, tag):
-    if not task is None:
-        return task 
-    return {
-        'name': 'generic-'+tag,
-        'description': f"Can't suggest something particular. Please add some new {tag} tasks to backstage", 
-        'status': 'new', 
-        'tag': tag, 
-        'remarks': "Find task by yourself", 
-        'summary': ''
-    }    
+                print(f"  {task_index + 1}. {color}{label}:{task_name}{RESET_COLOR}")
+
+def parse_slot(distribution, value):
+    # 'day task' numbers as printed by print_distribution -> (day number, slot number), (None, None) if invalid
+    numbers = value.split()
+    if len(numbers) != 2 or not all(number.isdigit() for number in numbers):
+        return None, None
+    day_number, slot_number = int(numbers[0]), int(numbers[1])
+    if not 1 <= day_number <= len(distribution) or not 1 <= slot_number <= len(distribution[day_number - 1]["tasks"]):
+        return None, None
+    return day_number, slot_number
+
+def get_generic_task(tag):
+    # name and description of the placeholder written for a slot without a task
+    return 'generic-'+tag, f"Can't suggest something particular. Please add some new {tag} tasks to backstage"
     
     
-def save_distribution_to_csv(distribution, permanent_tasks, output_file):
-    # Open the CSV file for writing
-    with open(output_file, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        
-        # Write the header
-        writer.writerow(["Task", "Description", "Status", "Date", "Tags", "Remarks", "Summary"])
-
-        # Write the distribution data
-        day_index = 0
-        for day in distribution:
-            task_date = day["date"]
-            tags = day["tags"]
-            tasks = day["tasks"]
-        
-            day_index += 1
-            perm_tasks = permanent_tasks.get(str(day_index), [])
-            
-            for ptask in perm_tasks:
-                # Replace $DATE with task_date in ptask
-                ptask = ptask.replace("$DATE", task_date)
-                
-                # Use csv.reader to correctly parse the CSV row
-                ptask_stream = io.StringIO(ptask)
-                ptask_fields = next(csv.reader(ptask_stream, skipinitialspace=True))
-                writer.writerow(ptask_fields)
-            
-            for i, task in enumerate(tasks): 
-                if task is None:
-                    task_name = "generic-"+tags[i]
-                    task_description = f"Can't suggest something particular. Please add some new {tags[i]} tasks to backstage"
-                    task_status = "new"
-                    task_tag = tags[i]
-                    task_remarks = "Find task by yourself"
-                    task_summary = ""
-                else:
-                    task_name = task["name"]
-                    task_description = task["description"]
-                    task_status = task["status"]
-                    task_tag = task["tag"]
-                    task_remarks = task["remarks"]
-                    task_summary = task["summary"]
-               
-                writer.writerow([f"{task_name}", f"{task_description}", f"{task_status}", f"{task_date}", f"{task_tag}", f"{task_remarks}", f"{task_summary}"])
-            
-            # Add an empty row after each day's tasks
-            writer.writerow(["", "", "", "", "", "", ""])            
-        
-        # Write the footer
-        writer.writerow(["Task focus", "", "", "", "", "", ""])
-        writer.writerow(["Week goal", "", "", "", "", "", ""])
-        writer.writerow(["Week summary", "", "", "", "", "", ""])
+CSV_HEADER = ("Task", "Description", "Status", "Date", "Tags", "Remarks", "Summary")
+EMPTY_ROW = ("", "", "", "", "", "", "")
 
-        
 
-def run_interactive_mode(verbose, weekly_schedule, tag_counts, tag_ranges, tasks_db, start_date, priorities, permanent_tasks, output_file):
-    week_dist = WeekDistribution(weekly_schedule, start_date, verbose)
+def iter_week_rows(week, permanent_tasks, answers):
+    # Rows of one week (up to 7 days) followed by the week footer
+    # permanent_tasks - Configuration.permanent_tasks (task_configuration.compile_permanent_tasks)
+    # answers - prompt -> answer of the enrichment stage, written to the remarks instead of the prompt
+    for day_index, day in enumerate(week, start=1):
+        task_date = day["date"]
+        tags = [available_tags[tag] for tag in day["tags"]]
+
+        for fields, date_positions in permanent_tasks.get(day_index, ()):
+            if date_positions:
+                fields = list(fields)
+                for i in date_positions:
+                    fields[i] = fields[i].replace("$DATE", task_date)
+            yield fields
+
+        for i, task in enumerate(day["tasks"]):
+            if task is None:
+                task_name, task_description = get_generic_task(tags[i])
+                instrumentation.count("generic-fallbacks")
+                yield (task_name, task_description, "new", task_date, tags[i], "Find task by yourself", "")
+            else:
+                yield (task.task, task.description, "new", task_date, tags[i],
+                       task.remarks + " " + answers.get(task.prompt, task.prompt), "")
+
+        # Add an empty row after each day's tasks
+        yield EMPTY_ROW
+
+    yield ("Task focus", "", "", "", "", "", "")
+    yield ("Week goal", "", "", "", "", "", "")
+    yield ("Week summary", "", "", "", "", "", "")
+
+
+def split_weeks(distribution):
+    return [distribution[day_index:day_index + 7] for day_index in range(0, len(distribution), 7)]
+
+
+def iter_distribution_rows(distribution, permanent_tasks, seed=None, answers=None):
+    # Rows of the plan csv: the header, then every week with its own footer, then the seed
+    yield CSV_HEADER
+    for week in split_weeks(distribution):
+        yield from iter_week_rows(week, permanent_tasks, answers or {})
+    if seed is not None:
+        yield ("Seed", str(seed), "", "", "", "", "")
+
+
+def get_week_output_file(output_file, week_number):
+    # week-plan.csv -> week-plan-week-2.csv
+    base, extension = os.path.splitext(output_file)
+    return f"{base}-week-{week_number}{extension}"
+
+
+def _write_rows(output_file, rows):
+    with open(output_file, mode='w', newline='', encoding='utf-8', buffering=1 << 16) as file:
+        csv.writer(file).writerows(rows)
+
+
+@instrumentation.timed("csv-writing")
+def save_distribution_to_csv(distribution, permanent_tasks, output_file, seed=None, split_by_week=False, answers=None):
+    # permanent_tasks - Configuration.permanent_tasks
+    # split_by_week - write every week of a multi-week plan to its own file (see get_week_output_file)
+    # answers - prompt -> answer of the enrichment stage (task_enrichment)
+    # Returns the list of the written files
+    weeks = split_weeks(distribution)
+    if not split_by_week or len(weeks) < 2:
+        _write_rows(output_file, iter_distribution_rows(distribution, permanent_tasks, seed, answers))
+        return [output_file]
+    output_files = []
+    for week_number, week in enumerate(weeks, start=1):
+        week_file = get_week_output_file(output_file, week_number)
+        _write_rows(week_file, iter_distribution_rows(week, permanent_tasks, seed, answers))
+        output_files.append(week_file)
+    return output_files
+
+
+def run_interactive_mode(verbose, weekly_schedule, tag_counts, tag_ranges, tasks_db, start_date, config, output_file, rng=random, seed=None, split_by_week=False, enrichment=None, watcher=None, history=None):
+    # enrichment - task_enrichment.EnrichmentSettings, the task prompts are answered before saving if given
+    # watcher - task_watcher watcher of the tasks directory, the changed task files are reloaded before every command
+    # history - plan_history.HistorySettings: avoid the recent tasks and record the saved plan
+    week_dist = WeekDistribution(config, weekly_schedule, start_date, verbose, rng)
+    task_pool = task_store.open_task_pool(tasks_db)
+    recent = plan_history.apply_history(task_pool, config, start_date, history)
+    if verbose and recent:
+        print(f"Avoiding {recent} task(s) of the last {history.avoid_days} day(s)")
+    week_dist.distribute_tasks(task_pool, tag_counts)
     
     while True:
-        week_dist.distribute_tasks(tasks_db, tag_counts)
         distribution = week_dist.get_distribution()
-        print_distribution( distribution, weekly_schedule, priorities )        
+        print_distribution(distribution, config)        
         
         user_input = input(
             """
 Enter your option:
-  'r day task' - regenerate specific task; Example: r 1 3
+  'r day task' - regenerate specific task on all of its days; Example: r 1 3
+  'rd day task' - regenerate specific task on this day only; Example: rd 1 3
   'r' - to regenerate tasks suggestion for entire week;
   'c' - to continue and create week suggestion csv;c
   'e' - exit
 """
         ).strip().lower()
+        if watcher is not None:
+            for error in task_watcher.reload_changed_files(watcher, task_pool, week_dist):
+                print(f"{get_color('#800000')}{format_error(error)}{RESET_COLOR}")
+            # The reloaded tasks get their history weights too
+            plan_history.apply_history(task_pool, config, start_date, history)
         if user_input == "r":
-            week_dist.distribute_tasks(tasks_db, tag_counts)
+            week_dist.distribute_tasks(task_pool, tag_counts)
+        elif user_input.startswith("r ") or user_input.startswith("rd "):
+            command, _, slot = user_input.partition(" ")
+            day_number, slot_number = parse_slot(distribution, slot)
+            if day_number is None:
+                print(f"Invalid day or task number. Example: {command} 1 3")
+            else:
+                week_dist.regenerate_slot(task_pool, day_number - 1, slot_number - 1, all_days=(command == "r"))
         elif user_input == "c":
-            print(f"Saving plan to {output_file}")
-            save_distribution_to_csv(distribution, permanent_tasks, output_file)   
+            answers = task_enrichment.enrich_distribution(distribution, enrichment) if enrichment else None
+            saved_files = save_distribution_to_csv(distribution, config.permanent_tasks, output_file, seed, split_by_week, answers)
+            for saved_file in saved_files:
+                print(f"Saved plan to {saved_file}")
+            plan_history.record_plan(config, distribution, saved_files, seed, history)
             break
         elif user_input == "e":
             print("Abort.")
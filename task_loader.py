@@ -0,0 +1,178 @@
+import csv
+import math
+import os
+import sys
+from collections import namedtuple
+
+import instrumentation
+
+available_tags = ['TODO','SKL','HLT','ART','DEV','EDU','LNG','PRJ','ENT']
+# Tags are stored in the task records as small ints (index in available_tags)
+TAG_IDS = {tag: tag_id for tag_id, tag in enumerate(available_tags)}
+
+# Columns every task csv file must provide (in any order)
+TASK_FIELDS = ('tag', 'task', 'description', 'pickup-priority', 'days', 'remarks', 'prompt')
+
+# Validation problem found while loading. row is the line number in the file, 0 for file level problems
+LoadError = namedtuple('LoadError', ['file', 'row', 'message'])
+
+
+# Task record created once at load time. Everything the planner needs is already converted:
+# tag id, float priority and the parsed days range.
+class Task:
+    __slots__ = ('tag', 'task', 'description', 'priority', 'min_days', 'max_days', 'remarks', 'prompt', 'file')
+
+    def __init__(self, tag, task, description, priority, min_days, max_days, remarks, prompt, file):
+        self.tag = tag
+        self.task = task
+        self.description = description
+        self.priority = priority
+        self.min_days = min_days
+        self.max_days = max_days
+        self.remarks = remarks
+        self.prompt = prompt
+        self.file = file
+
+    @property
+    def tag_name(self):
+        return available_tags[self.tag]
+
+    @property
+    def days(self):
+        return str(self.min_days) if self.min_days == self.max_days else f"{self.min_days}-{self.max_days}"
+
+    def __reduce__(self):
+        # Pickled as a plain tuple of fields (task DBs sent to the batch worker processes)
+        return Task, (self.tag, self.task, self.description, self.priority, self.min_days, self.max_days,
+                      self.remarks, self.prompt, self.file)
+
+    def __repr__(self):
+        return f"Task({self.tag_name}, {self.task!r}, days={self.days}, priority={self.priority}, file={self.file!r})"
+
+
+def format_error(error):
+    if error.row:
+        return f"Error: {error.message} at row {error.row}. (File:{error.file})"
+    return f"Error: {error.message}. (File:{error.file})"
+
+
+def parse_days_range(days):
+    # '2-4' -> (2, 4), '1' -> (1, 1)
+    if '-' in days:
+        min_days, max_days = map(int, days.split('-'))
+    else:
+        min_days = max_days = int(days)
+    return min_days, max_days
+
+
+def parse_tasks(lines, file_name):
+    # Validates the header once and then validates and converts every row while it is parsed.
+    # Invalid rows are skipped and reported in the returned errors list.
+    tasks = []
+    errors = []
+    file_name = sys.intern(file_name)
+    reader = csv.reader(lines, delimiter=';')
+
+    headers = next(reader, None)
+    if headers is None:
+        errors.append(LoadError(file_name, 0, "File is empty"))
+        return tasks, errors
+
+    missing = [field for field in TASK_FIELDS if field not in headers]
+    if missing:
+        errors.append(LoadError(file_name, 1, f"Missing columns {', '.join(missing)} in header"))
+        return tasks, errors
+
+    columns_count = len(headers)
+    tag_i, task_i, description_i, priority_i, days_i, remarks_i, prompt_i = (headers.index(field) for field in TASK_FIELDS)
+
+    line_number = reader.line_num
+    for row in reader:
+        # First line of the row (a quoted field can span several lines)
+        row_number = line_number + 1
+        line_number = reader.line_num
+        if not row:
+            continue
+
+        if len(row) != columns_count:
+            errors.append(LoadError(file_name, row_number, f"Inconsistent number of columns. Expected {columns_count} but got {len(row)}"))
+            continue
+
+        tag = row[tag_i]
+        if tag not in available_tags:
+            errors.append(LoadError(file_name, row_number, f"'{tag}' tag found which is not allowed literal"))
+            continue
+
+        task = row[task_i]
+        if not task:
+            errors.append(LoadError(file_name, row_number, f"'{task}' has wrong value for the task"))
+            continue
+
+        # Plain decimal numbers only ('2', '0.5'), no signs, exponents or 'inf'
+        try:
+            priority = float(row[priority_i]) if row[priority_i].replace('.', '', 1).isdigit() else -1.0
+        except ValueError:
+            priority = -1.0
+        if not (priority >= 0 and math.isfinite(priority)):
+            errors.append(LoadError(file_name, row_number, f"'{row[priority_i]}' has wrong value for pickup-priority"))
+            continue
+
+        try:
+            min_days, max_days = parse_days_range(row[days_i].strip())
+        except ValueError:
+            min_days = max_days = 0
+        if not (1 <= min_days <= max_days):
+            errors.append(LoadError(file_name, row_number, f"'{row[days_i]}' has wrong value for days"))
+            continue
+
+        tasks.append(Task(TAG_IDS[tag], task, row[description_i], priority, min_days, max_days,
+                          row[remarks_i], row[prompt_i], file_name))
+
+    return tasks, errors
+
+
+def load_tasks_file(file_path):
+    file_name = os.path.basename(file_path)
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
+            return parse_tasks(csvfile, file_name)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        return [], [LoadError(file_name, 0, f"Can't read CSV file: {e}")]
+
+
+def list_task_files(tasks_dir):
+    # Sorted so the loading order (and therefore the plans) doesn't depend on the file system
+    return sorted(file_name for file_name in os.listdir(tasks_dir) if file_name.endswith('.csv'))
+
+
+def load_tasks_directory(tasks_dir, verbose=False, cache=None, jobs=1):
+    # cache is an optional task_cache.TaskCache, unchanged files are taken from it instead of being parsed.
+    # With jobs > 1 the files are read and parsed by a thread pool, most of the loading time on network
+    # drives is I/O wait. Results are merged in sorted file name order either way, so plans stay reproducible.
+    load_file = cache.load_file if cache is not None else load_tasks_file
+    file_paths = [os.path.join(tasks_dir, file_name) for file_name in list_task_files(tasks_dir)]
+
+    if jobs > 1 and len(file_paths) > 1:
+        # Imported here, concurrent.futures is a noticeable part of the startup time of single threaded runs
+        from concurrent.futures import ThreadPoolExecutor
+        executor = ThreadPoolExecutor(max_workers=min(jobs, len(file_paths)))
+        results = executor.map(load_file, file_paths)
+    else:
+        executor = None
+        results = map(load_file, file_paths)
+
+    all_tasks = []
+    all_errors = []
+    try:
+        for file_path, (tasks, errors) in zip(file_paths, results):
+            if verbose:
+                print(f"Loading file: {file_path}")
+            all_tasks.extend(tasks)
+            all_errors.extend(errors)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    instrumentation.count("files-loaded", len(file_paths))
+    instrumentation.count("rows-loaded", len(all_tasks))
+    instrumentation.count("rows-rejected", sum(1 for error in all_errors if error.row > 1))
+    return all_tasks, all_errors
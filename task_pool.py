@@ -0,0 +1,279 @@
+import random
+
+
+def get_task_key(task):
+    # Identity of a task over the runs (plan history): the records are recreated on every load
+    return task.tag, task.task, task.description
+
+
+class FenwickTree:
+    # Binary indexed tree over float weights: point update, prefix sum and weighted search in O(log n)
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.tree = [0.0] + [float(w) for w in weights]
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, count):
+        result = 0.0
+        i = count
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def total(self):
+        return self.prefix_sum(self.size)
+
+    def append(self, weight):
+        self.size += 1
+        i = self.size
+        # Node i covers the weights (i - lowbit(i), i]: the new weight plus the ones before it in that range
+        self.tree.append(float(weight) + self.prefix_sum(i - 1) - self.prefix_sum(i - (i & -i)))
+
+    def find(self, value):
+        # Smallest index whose inclusive prefix sum is greater than value (same rule as bisect in random.choices)
+        pos = 0
+        step = 1 << (self.size.bit_length() - 1) if self.size else 0
+        while step:
+            next_pos = pos + step
+            if next_pos <= self.size and self.tree[next_pos] <= value:
+                pos = next_pos
+                value -= self.tree[next_pos]
+            step >>= 1
+        return min(pos, self.size - 1)
+
+
+class TaskBucket:
+    # Tasks of one tag with the same minimum amount of days, in loading order
+    def __init__(self, min_days):
+        self.min_days = min_days
+        self.tasks = []
+        self.priorities = []
+        self.weights = []  # current weights, 0 for taken tasks
+        self.alive = 0  # tasks which still can be picked (positive weight)
+        self.tree = None
+
+    def build(self):
+        self.weights = list(self.priorities)
+        self.tree = FenwickTree(self.weights)
+        self.alive = sum(1 for w in self.weights if w > 0)
+
+    def rebuild(self):
+        # Fresh sums of the current weights; the updates of take() can leave float cancellation in the tree
+        self.tree = FenwickTree(self.weights)
+
+    def total(self):
+        return self.tree.total() if self.alive > 0 else 0.0
+
+    def find_alive(self, value):
+        # tree.find() as a linear scan which only returns tasks with a positive weight
+        last = None
+        for index, weight in enumerate(self.weights):
+            if weight > 0:
+                last = index
+                if value < weight:
+                    return index
+                value -= weight
+        return last
+
+    def take(self, index):
+        self.tree.add(index, -self.weights[index])
+        self.weights[index] = 0.0
+        self.alive -= 1
+
+    def restore(self, index):
+        # The priority may have been set to 0 while the task was taken (set_priority, remove)
+        if self.priorities[index] > 0:
+            self.weights[index] = self.priorities[index]
+            self.tree.add(index, self.priorities[index])
+            self.alive += 1
+
+    def set_priority(self, index, priority, taken=False):
+        # A taken task gets the new weight when it is restored
+        self.priorities[index] = priority
+        if not taken:
+            self.tree.add(index, priority - self.weights[index])
+            self.alive += (priority > 0) - (self.weights[index] > 0)
+            self.weights[index] = priority
+
+    def append(self, task):
+        self.tasks.append(task)
+        self.priorities.append(task.priority)
+        self.weights.append(task.priority)
+        self.tree.append(task.priority)
+        if task.priority > 0:
+            self.alive += 1
+        return len(self.tasks) - 1
+
+    def remove(self, index):
+        # The task keeps its index but can't be picked or restored any more
+        if self.weights[index] > 0:
+            self.tree.add(index, -self.weights[index])
+            self.alive -= 1
+        self.weights[index] = 0.0
+        self.priorities[index] = 0.0
+
+
+# Pool of tasks indexed by tag and bucketed by minimum days.
+# pick() is weighted sampling without replacement by pickup-priority: a task is chosen with probability
+# weight / total weight of the tasks of the tag which fit into the available slots (the same distribution
+# as random.choices over the filtered list) and is removed from the pool. A pick costs O(buckets + log n).
+# The pool is built once over the loaded records and never modifies them; reset() puts the picked tasks back,
+# so a regeneration costs only as much as the tasks it actually picks. put_back() returns a single task in O(log n).
+# remove_file() and add_tasks() patch the pool when a task file changes (--watch): removed tasks stay in their
+# buckets with zero weight, added tasks are appended to the end of their buckets. The new records of the tasks which
+# are still in the distribution are added as taken, so they aren't picked a second time.
+# set_weight_factors() scales the pickup-priority of some tasks (plan history), the task records keep their priority.
+class TaskPool:
+    def __init__(self, tasks):
+        self.taken = {}  # picked task -> (bucket, index), in picking order
+        self.file_entries = None  # file name -> [(bucket, index)], built on the first remove_file()
+        self.key_entries = None  # (tag, task, description) -> [(bucket, index)], built on the first set_weight_factors()
+        self.scaled = []  # (bucket, index) of the tasks with a weight factor
+        buckets = {}
+        for task in tasks:
+            tag_buckets = buckets.setdefault(task.tag, {})
+            bucket = tag_buckets.get(task.min_days)
+            if bucket is None:
+                bucket = tag_buckets[task.min_days] = TaskBucket(task.min_days)
+            bucket.tasks.append(task)
+            bucket.priorities.append(task.priority)
+
+        self.buckets = {}
+        for tag, tag_buckets in buckets.items():
+            self.buckets[tag] = [tag_buckets[min_days] for min_days in sorted(tag_buckets)]
+            for bucket in self.buckets[tag]:
+                bucket.build()
+
+    def reset(self):
+        for bucket, index in self.taken.values():
+            bucket.restore(index)
+        self.taken.clear()
+
+    def put_back(self, task):
+        # Make a picked task available again
+        entry = self.taken.pop(task, None)
+        if entry is not None:
+            bucket, index = entry
+            bucket.restore(index)
+
+    def _index_files(self):
+        self.file_entries = {}
+        for tag_buckets in self.buckets.values():
+            for bucket in tag_buckets:
+                for index, task in enumerate(bucket.tasks):
+                    self.file_entries.setdefault(task.file, []).append((bucket, index))
+
+    def get_files(self):
+        if self.file_entries is None:
+            self._index_files()
+        return set(self.file_entries)
+
+    def remove_file(self, file_name):
+        # Remove the tasks loaded from file_name (Task.file), returns their count
+        if self.file_entries is None:
+            self._index_files()
+        entries = self.file_entries.pop(file_name, [])
+        for bucket, index in entries:
+            task = bucket.tasks[index]
+            # A picked task stays in the current distribution but isn't returned to the pool by reset()
+            self.taken.pop(task, None)
+            bucket.remove(index)
+            if self.key_entries is not None:
+                self.key_entries[get_task_key(task)].remove((bucket, index))
+        if self.scaled:
+            removed = set(entries)
+            self.scaled = [entry for entry in self.scaled if entry not in removed]
+        return len(entries)
+
+    def add_tasks(self, tasks, taken_keys=()):
+        # taken_keys - get_task_key() of the tasks placed in the current distribution; their new records are
+        # marked as taken. Returns those records
+        taken = []
+        for task in tasks:
+            tag_buckets = self.buckets.setdefault(task.tag, [])
+            bucket = next((bucket for bucket in tag_buckets if bucket.min_days == task.min_days), None)
+            if bucket is None:
+                bucket = TaskBucket(task.min_days)
+                bucket.build()
+                tag_buckets.append(bucket)
+                tag_buckets.sort(key=lambda b: b.min_days)
+            index = bucket.append(task)
+            if self.file_entries is not None:
+                self.file_entries.setdefault(task.file, []).append((bucket, index))
+            if self.key_entries is not None:
+                self.key_entries.setdefault(get_task_key(task), []).append((bucket, index))
+            if get_task_key(task) in taken_keys:
+                if bucket.weights[index] > 0:
+                    bucket.take(index)
+                self.taken[task] = (bucket, index)
+                taken.append(task)
+        return taken
+
+    def set_weight_factors(self, factors):
+        # factors: (tag, task, description) -> multiplier of the pickup-priority, 0 excludes the task.
+        # Replaces the factors of the previous call
+        if not factors and not self.scaled:
+            return
+        if self.key_entries is None:
+            self.key_entries = {}
+            for tag_buckets in self.buckets.values():
+                for bucket in tag_buckets:
+                    for index, task in enumerate(bucket.tasks):
+                        if bucket.priorities[index] > 0 or task.priority <= 0:  # skip the removed tasks
+                            self.key_entries.setdefault(get_task_key(task), []).append((bucket, index))
+        for bucket, index in self.scaled:
+            bucket.set_priority(index, bucket.tasks[index].priority, bucket.tasks[index] in self.taken)
+        self.scaled = []
+        for key, factor in factors.items():
+            for bucket, index in self.key_entries.get(key, ()):
+                task = bucket.tasks[index]
+                bucket.set_priority(index, task.priority * factor, task in self.taken)
+                self.scaled.append((bucket, index))
+
+    def pick(self, tag, max_slots_count, rng=random):
+        # tag is the tag id of the task records (task_loader.TAG_IDS)
+        candidates = []
+        totals = []
+        for bucket in self.buckets.get(tag, ()):
+            if bucket.min_days > max_slots_count:
+                break
+            if bucket.alive > 0:
+                candidates.append(bucket)
+                totals.append(bucket.total())
+        if not candidates:
+            return None
+
+        bucket, value = self._draw_bucket(candidates, totals, rng)
+        index = bucket.tree.find(value)
+        if bucket.weights[index] <= 0:
+            # The draw landed on a taken task: after a much larger weight was taken out, float cancellation can
+            # leave stale sums in the trees (even a total <= 0 while tasks are alive). Rebuild them from the live
+            # weights and draw again, the scan only returns a live task
+            for candidate in candidates:
+                candidate.rebuild()
+            bucket, value = self._draw_bucket(candidates, [candidate.total() for candidate in candidates], rng)
+            index = bucket.find_alive(value)
+        bucket.take(index)
+        task = bucket.tasks[index]
+        self.taken[task] = (bucket, index)
+        return task
+
+    @staticmethod
+    def _draw_bucket(candidates, totals, rng):
+        # (bucket, value within the bucket) of a uniform draw over the total weight of the candidates
+        value = rng.random() * sum(totals)
+        for bucket, bucket_total in zip(candidates, totals):
+            if value < bucket_total or bucket is candidates[-1]:
+                break
+            value -= bucket_total
+        return bucket, value
@@ -0,0 +1,155 @@
+import argparse
+import csv
+import os
+import random
+import sys
+
+from task_loader import TASK_FIELDS, Task, available_tags
+from task_pool import TaskBucket, TaskPool
+
+# Optional SQLite storage of the tasks (--tasks-db), the tasks-dir CSV files stay the default.
+# import copies the loaded tasks-dir into the store in loading order, export writes the store back as CSV files.
+# SqliteTaskPool loads a (tag, min_days) bucket with an indexed query the first time a pick can use it, so a plan
+# reads only the tags and durations it needs. The buckets have the same tasks in the same order as the buckets of
+# TaskPool over the CSV files, so a seed gives the same plan with both backends.
+#
+#   python task_store.py import tasks.sqlite [--cfg task-configuration.json]
+#   python task_store.py export tasks.sqlite exported-tasks
+#   week_organizer_main.py --tasks-db tasks.sqlite
+
+
+def connect(path):
+    # Imported here, sqlite3 is a noticeable part of the startup time of the CSV backend runs
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY, tag INTEGER NOT NULL, task TEXT NOT NULL, description TEXT NOT NULL,
+            priority REAL NOT NULL, min_days INTEGER NOT NULL, max_days INTEGER NOT NULL, remarks TEXT NOT NULL,
+            prompt TEXT NOT NULL, file TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS tasks_tag_min_days ON tasks (tag, min_days, id);
+        CREATE INDEX IF NOT EXISTS tasks_tag_priority ON tasks (tag, priority);
+    """)
+    return connection
+
+
+def import_tasks(tasks, path):
+    # Replaces the content of the store; id keeps the loading order
+    connection = connect(path)
+    try:
+        with connection:
+            connection.execute("DELETE FROM tasks")
+            connection.executemany(
+                "INSERT INTO tasks (id, tag, task, description, priority, min_days, max_days, remarks, prompt, file) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((i, t.tag, t.task, t.description, t.priority, t.min_days, t.max_days, t.remarks, t.prompt, t.file)
+                 for i, t in enumerate(tasks)))
+    finally:
+        connection.close()
+
+
+def export_tasks(path, tasks_dir):
+    # One CSV file per source file of the tasks, returns the written file names
+    os.makedirs(tasks_dir, exist_ok=True)
+    connection = connect(path)
+    files = {}
+    try:
+        for row in connection.execute("SELECT tag, task, description, priority, min_days, max_days, remarks, prompt, file "
+                                      "FROM tasks ORDER BY id"):
+            files.setdefault(row[8], []).append(Task(*row))
+    finally:
+        connection.close()
+    for file_name, tasks in files.items():
+        with open(os.path.join(tasks_dir, file_name), 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';', lineterminator='\n')
+            writer.writerow(TASK_FIELDS)
+            for task in tasks:
+                writer.writerow((available_tags[task.tag], task.task, task.description, repr(task.priority),
+                                 task.days, task.remarks, task.prompt))
+    return list(files)
+
+
+class SqliteTaskPool(TaskPool):
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Task store {path} does not exist")
+        super().__init__(())
+        self.connection = connect(path)
+        # Empty buckets, filled by _load_bucket
+        for tag, min_days in self.connection.execute("SELECT DISTINCT tag, min_days FROM tasks ORDER BY tag, min_days"):
+            self.buckets.setdefault(tag, []).append(TaskBucket(min_days))
+
+    def _load_bucket(self, tag, bucket):
+        rows = self.connection.execute(
+            "SELECT tag, task, description, priority, min_days, max_days, remarks, prompt, file FROM tasks "
+            "WHERE tag = ? AND min_days = ? ORDER BY id", (tag, bucket.min_days))
+        for row in rows:
+            task = Task(*row)
+            bucket.tasks.append(task)
+            bucket.priorities.append(task.priority)
+        bucket.build()
+
+    def _load_all(self):
+        for tag, tag_buckets in self.buckets.items():
+            for bucket in tag_buckets:
+                if bucket.tree is None:
+                    self._load_bucket(tag, bucket)
+
+    def _index_files(self):
+        self._load_all()
+        super()._index_files()
+
+    def set_weight_factors(self, factors):
+        if factors:
+            self._load_all()
+        super().set_weight_factors(factors)
+
+    def add_tasks(self, tasks, taken_keys=()):
+        self._load_all()
+        return super().add_tasks(tasks, taken_keys)
+
+    def pick(self, tag, max_slots_count, rng=random):
+        for bucket in self.buckets.get(tag, ()):
+            if bucket.min_days > max_slots_count:
+                break
+            if bucket.tree is None:
+                self._load_bucket(tag, bucket)
+        return super().pick(tag, max_slots_count, rng)
+
+
+def open_task_pool(tasks_db):
+    # tasks_db - the loaded tasks of the CSV files or the path of a task store
+    return SqliteTaskPool(tasks_db) if isinstance(tasks_db, str) else TaskPool(tasks_db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite task store: import the tasks-dir CSV files or export them back")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Load the tasks-dir of the configuration into the store")
+    import_parser.add_argument("store", help="Task store file")
+    import_parser.add_argument("--cfg", default="task-configuration.json", help="Configuration file (its tasks-dir)")
+    export_parser = commands.add_parser("export", help="Write the store as CSV files")
+    export_parser.add_argument("store", help="Task store file")
+    export_parser.add_argument("tasks_dir", help="Output directory")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import week_organizer_main
+        cfg = week_organizer_main.load_configuration(args.cfg)
+        if not os.path.isdir(cfg.tasks_dir):
+            print(f"Error: Directory {cfg.tasks_dir} does not exist.")
+            sys.exit(1)
+        tasks = week_organizer_main.load_csv_files_from_directory(cfg.tasks_dir, False)
+        import_tasks(tasks, args.store)
+        print(f"Imported {len(tasks)} tasks of {cfg.tasks_dir} into {args.store}")
+    else:
+        if not os.path.exists(args.store):
+            print(f"Error: Task store {args.store} does not exist.")
+            sys.exit(1)
+        files = export_tasks(args.store, args.tasks_dir)
+        print(f"Exported {len(files)} files to {args.tasks_dir}")
+
+
+if __name__ == "__main__":
+    main()
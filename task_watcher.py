@@ -0,0 +1,130 @@
+import os
+import struct
+import sys
+
+import instrumentation
+import task_loader
+
+# Watches the tasks directory while the planner is open (--watch). poll() never blocks, it returns the names of the
+# *.csv files added, modified or deleted since the previous poll. Uses inotify on Linux (through ctypes) and compares
+# the mtime and size of the files everywhere else or when inotify isn't available.
+# reload_changed_files() re-parses only those files and patches the task pool in place; the tasks of the open plan
+# keep their slots and stay taken.
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# IN_MODIFY is left out: a file is reloaded once it is closed, not on every write of the editor
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    def __init__(self, tasks_dir):
+        self.tasks_dir = tasks_dir
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        try:
+            file_names = task_loader.list_task_files(self.tasks_dir)
+        except OSError:
+            return snapshot
+        for file_name in file_names:
+            try:
+                stat = os.stat(os.path.join(self.tasks_dir, file_name))
+            except OSError:
+                continue
+            snapshot[file_name] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self):
+        snapshot = self._scan()
+        changed = {file_name for file_name in snapshot.keys() | self.snapshot.keys()
+                   if snapshot.get(file_name) != self.snapshot.get(file_name)}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, tasks_dir):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.tasks_dir = tasks_dir
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(tasks_dir), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Can't watch {tasks_dir}")
+
+    def poll(self):
+        # None if the kernel queue overflowed and events were lost
+        changed = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                file_name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif file_name.endswith('.csv'):
+                    changed.add(file_name)
+        return None if overflow else changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(tasks_dir):
+    # Create it before loading the tasks: a file saved during the loading is reloaded on the first poll
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(tasks_dir)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(tasks_dir)
+
+
+@instrumentation.timed("task-reload")
+def reload_changed_files(watcher, task_pool, week_dist=None):
+    # week_dist - task_level_suggestion.WeekDistribution of the open plan, its tasks are moved to the new records
+    # Returns the load errors of the reloaded files
+    changed = watcher.poll()
+    if changed is None:
+        changed = set(task_loader.list_task_files(watcher.tasks_dir)) | task_pool.get_files()
+    errors = []
+    for file_name in sorted(changed):
+        placed_keys = week_dist.get_task_keys(file_name) if week_dist is not None else set()
+        removed = task_pool.remove_file(file_name)
+        file_path = os.path.join(watcher.tasks_dir, file_name)
+        tasks = []
+        if os.path.exists(file_path):
+            tasks, file_errors = task_loader.load_tasks_file(file_path)
+            errors.extend(file_errors)
+            taken = task_pool.add_tasks(tasks, placed_keys)
+            if week_dist is not None:
+                week_dist.replace_tasks(taken)
+        instrumentation.count("files-reloaded")
+        print(f"Reloaded {file_name}: {len(tasks)} task(s), {removed} task(s) before")
+    return errors
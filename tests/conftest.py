@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import task_configuration  # noqa: E402
+import task_loader  # noqa: E402
+
+FIXTURE_TASKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "tasks")
+
+
+def _tag(weekly_amount_days, daily_amount, sorting_index, priority=1.0):
+    return {"weekly-amount-days": weekly_amount_days, "daily-amount": daily_amount,
+            "sorting-index": sorting_index, "pick-up-priority": priority}
+
+
+def make_config(tasks_dir=FIXTURE_TASKS_DIR, stash_dir=None):
+    data = {
+        "tasks-dir": tasks_dir,
+        "tag-distribution": {
+            "daily-priorities": {
+                "#HLT": _tag([7], [1, 2], 0, 3.0),
+                "#LNG": _tag([7], [1, 2], 1),
+                "#PRJ": _tag([7], [1], 2),
+                "#ART": _tag([2, 4], [1], 3, 0.7),
+                "#DEV": _tag([2, 4], [1], 4, 0.6),
+                "#EDU": _tag([7], [1], 5, 0.6),
+            }
+        },
+        "permanent-tasks": {"1": ["organize-week,Plan the week,new,$DATE,TODO,,"]},
+    }
+    if stash_dir is not None:
+        data["stash-dir"] = stash_dir
+    return task_configuration.Configuration(data, "test-configuration")
+
+
+@pytest.fixture
+def config():
+    return make_config()
+
+
+@pytest.fixture
+def fixture_tasks():
+    tasks, errors = task_loader.load_tasks_directory(FIXTURE_TASKS_DIR)
+    assert not errors
+    return tasks
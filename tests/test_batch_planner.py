@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+import batch_planner
+import instrumentation
+import plan_history
+from conftest import make_config
+
+START_DATES = ["03-Jun-2024", "10-Jun-2024", "17-Jun-2024", "24-Jun-2024"]
+
+
+def run_batch(tmp_path, name, tasks, jobs, history):
+    cfg = make_config(stash_dir=str(tmp_path / f"stash-{name}"))
+    (tmp_path / name).mkdir()
+    # The same history before the batch: one plan of the previous week
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch_planner.run_batch([(cfg, "27-May-2024", str(tmp_path / name / "previous.csv"))],
+                                {cfg.tasks_dir: tasks}, 1, 2, False,
+                                history=plan_history.HistorySettings(True, 0, 0.0))
+        plans = [(cfg, start_date, str(tmp_path / name / f"{start_date}.csv")) for start_date in START_DATES]
+        batch_planner.run_batch(plans, {cfg.tasks_dir: tasks}, jobs, 5, False, history=history)
+    plan_files = {}
+    for start_date in START_DATES:
+        with open(tmp_path / name / f"{start_date}.csv", 'rb') as file:
+            plan_files[start_date] = file.read()
+    return cfg, plan_files
+
+
+def test_avoid_recent_does_not_depend_on_jobs(tmp_path, fixture_tasks):
+    history = plan_history.HistorySettings(True, 14, 0.0)
+    _, sequential = run_batch(tmp_path, "jobs-1", fixture_tasks, 1, history)
+    cfg, parallel = run_batch(tmp_path, "jobs-4", fixture_tasks, 4, history)
+    assert sequential == parallel
+
+    # All the plans are recorded after the batch
+    history_file = plan_history.PlanHistory(plan_history.get_history_path(cfg))
+    try:
+        recorded = {os.path.basename(file) for file, in history_file.connection.execute("SELECT file FROM plans")}
+    finally:
+        history_file.close()
+    assert recorded == {"previous.csv"} | {f"{start_date}.csv" for start_date in START_DATES}
+
+
+def test_avoid_recent_changes_the_plan(tmp_path, fixture_tasks):
+    _, avoided = run_batch(tmp_path, "avoid", fixture_tasks, 1, plan_history.HistorySettings(False, 14, 0.0))
+    _, plain = run_batch(tmp_path, "plain", fixture_tasks, 1, plan_history.HistorySettings(False, 0, 0.0))
+    assert avoided["03-Jun-2024"] != plain["03-Jun-2024"]
+
+
+@pytest.fixture
+def profiled():
+    instrumentation.enable()
+    instrumentation.reset()
+    yield
+    instrumentation.enabled = False
+    instrumentation.reset()
+
+
+def profile_batch(tmp_path, name, tasks, jobs):
+    cfg = make_config()
+    (tmp_path / name).mkdir()
+    instrumentation.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch_planner.run_batch([(cfg, start_date, str(tmp_path / name / f"{start_date}.csv"))
+                                 for start_date in START_DATES], {cfg.tasks_dir: tasks}, jobs, 5, False)
+    report = instrumentation.get_report()
+    return {stage: stage_report["calls"] for stage, stage_report in report["stages"].items()}, report["counters"]
+
+
+def test_profile_includes_the_workers(tmp_path, fixture_tasks, profiled):
+    sequential = profile_batch(tmp_path, "jobs-1", fixture_tasks, 1)
+    parallel = profile_batch(tmp_path, "jobs-2", fixture_tasks, 2)
+    assert sequential[0]["task-distribution"] == len(START_DATES)
+    assert sequential == parallel
@@ -0,0 +1,82 @@
+import pytest
+
+import llm_cache
+from llm_cache import LlmCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)
+    return clock
+
+
+def keys(path):
+    cache = LlmCache(path)
+    try:
+        return {key for key, in cache.connection.execute("SELECT key FROM responses")}
+    finally:
+        cache.close()
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LlmCache(path, ttl=100)
+    cache.put("key", "answer")
+    clock.now += 100
+    assert cache.get("key") == "answer"
+    clock.now += 1  # the creation time counts, not the last use
+    assert cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+    assert keys(path) == set()
+
+
+def test_ttl_0_never_expires(tmp_path, clock):
+    cache = LlmCache(str(tmp_path / "cache.sqlite"), ttl=0)
+    cache.put("key", "answer")
+    clock.now += 10**9
+    assert cache.get("key") == "answer"
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LlmCache(path, max_entries=3)
+    for key in ("a", "b", "c", "d"):
+        clock.now += 1
+        cache.put(key, f"answer {key}")
+    clock.now += 1
+    # Nothing is evicted before close()
+    assert [cache.get(key) for key in ("b", "c")] == ["answer b", "answer c"]
+    clock.now += 1
+    assert cache.get("a") == "answer a"
+    cache.close()
+    # Last use: a, then b and c, d is the oldest
+    assert keys(path) == {"a", "b", "c"}
+
+    cache = LlmCache(path, max_entries=1)
+    cache.close()
+    assert keys(path) == {"a"}
+
+
+def test_put_replaces_the_answer(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LlmCache(path, ttl=100)
+    cache.put("key", "old")
+    clock.now += 90
+    cache.put("key", "new")
+    cache.close()
+
+    clock.now += 50  # younger than the ttl since the replacement
+    cache = LlmCache(path, ttl=100)
+    assert cache.get("key") == "new"
+    cache.close()
@@ -0,0 +1,82 @@
+import csv
+import os
+from datetime import datetime, timedelta
+
+import task_configuration
+from task_level_suggestion import iter_distribution_rows, save_distribution_to_csv
+from task_loader import TAG_IDS, Task
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "golden")
+
+PERMANENT_TASKS = {
+    "1": ["workout,App,new,$DATE,HLT,,", "organize-week,\"Move to done, summarize\",new,$DATE,TODO,,"],
+    "7": ["review,\"Week of $DATE\",new,$DATE,TODO,\"quote \"\"here\"\"\","],
+}
+
+
+def make_task(tag, name, description, remarks, prompt):
+    return Task(TAG_IDS[tag], name, description, 1.0, 1, 2, remarks, prompt, "x.csv")
+
+
+def make_distribution():
+    read = make_task("EDU", "read", 'The "Pragmatic" book, ch. 3', "", "summarize chapter 3")
+    run = make_task("HLT", "run", "5 km; easy pace", "outside", "")
+    draw = make_task("ART", "draw", "Портрет, карандаш", "", "")
+    code = make_task("DEV", "code", "multi\nline", "see notes,", "what is LLVM?")
+    days = [
+        (["HLT", "EDU", "TODO"], [run, read, None]),
+        (["HLT", "DEV"], [run, code]),
+        ([], []),
+        (["ART", "DEV", "DEV"], [draw, code, None]),
+        (["EDU"], [read]),
+        (["HLT", "ART"], [None, draw]),
+        (["TODO"], [None]),
+    ]
+    start = datetime(2024, 6, 3)
+    distribution = []
+    for offset, (tags, tasks) in enumerate(days):
+        date = start + timedelta(days=offset)
+        distribution.append({"date": f"{date.strftime('%d-%b-%Y')} {date.strftime('%A')}",
+                             "tags": [TAG_IDS[tag] for tag in tags], "tasks": tasks})
+    return distribution
+
+
+def read_bytes(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_plan_matches_the_golden_output(tmp_path):
+    # week-plan.csv was written by save_distribution_to_csv before the rows were streamed from compiled templates
+    output_file = str(tmp_path / "plan.csv")
+    permanent_tasks = task_configuration.compile_permanent_tasks(PERMANENT_TASKS)
+    assert save_distribution_to_csv(make_distribution(), permanent_tasks, output_file, seed=123456789) == [output_file]
+    assert read_bytes(output_file) == read_bytes(os.path.join(GOLDEN_DIR, "week-plan.csv"))
+
+
+def test_rows_without_seed_and_with_answers():
+    permanent_tasks = task_configuration.compile_permanent_tasks(PERMANENT_TASKS)
+    with open(os.path.join(GOLDEN_DIR, "week-plan.csv"), newline='', encoding='utf-8') as file:
+        golden_rows = [tuple(row) for row in csv.reader(file)]
+
+    rows = [tuple(row) for row in iter_distribution_rows(make_distribution(), permanent_tasks)]
+    assert rows == golden_rows[:-1]
+
+    # Answers of the enrichment stage replace the prompts in the remarks
+    answers = {"what is LLVM?": "A compiler infrastructure."}
+    rows = [tuple(row) for row in iter_distribution_rows(make_distribution(), permanent_tasks, 1, answers)]
+    changed = [(golden, row) for golden, row in zip(golden_rows, rows) if golden != row]
+    assert [row[5] for _, row in changed] == ["see notes, A compiler infrastructure."] * 2 + [""]
+    assert changed[-1][1] == ("Seed", "1", "", "", "", "", "")
+
+
+def test_split_weeks_have_their_own_footer(tmp_path):
+    distribution = make_distribution()
+    two_weeks = distribution + [dict(day, date=day["date"].replace("Jun", "Jul")) for day in distribution]
+    files = save_distribution_to_csv(two_weeks, {}, str(tmp_path / "plan.csv"), seed=5, split_by_week=True)
+    assert [os.path.basename(file) for file in files] == ["plan-week-1.csv", "plan-week-2.csv"]
+    for file in files:
+        with open(file, newline='', encoding='utf-8') as csv_file:
+            rows = list(csv.reader(csv_file))
+        assert rows[0] == ["Task", "Description", "Status", "Date", "Tags", "Remarks", "Summary"]
+        assert [row[0] for row in rows[-4:]] == ["Task focus", "Week goal", "Week summary", "Seed"]
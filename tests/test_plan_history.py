@@ -0,0 +1,27 @@
+from plan_history import PlanHistory, get_plan_rows
+from task_configuration import compile_permanent_tasks
+from task_level_suggestion import save_distribution_to_csv
+from task_loader import TAG_IDS
+from test_plan_csv import PERMANENT_TASKS, make_distribution, make_task
+
+
+def test_import_matches_the_recorded_entries(tmp_path):
+    distribution = make_distribution()
+    # A task of the task files with the name of a permanent task is still an entry
+    distribution[2]["tags"], distribution[2]["tasks"] = [TAG_IDS["HLT"]], [make_task("HLT", "workout", "Gym", "", "")]
+    permanent_tasks = compile_permanent_tasks(PERMANENT_TASKS)
+    plan_file = str(tmp_path / "week-plan.csv")
+    save_distribution_to_csv(distribution, permanent_tasks, plan_file)
+
+    history = PlanHistory(str(tmp_path / "plan-history.sqlite"))
+    try:
+        assert history.import_plan_file(plan_file, permanent_tasks) == len(get_plan_rows(distribution)[1])
+        imported = history.connection.execute("SELECT date, tag, task, description FROM entries").fetchall()
+        recent = history.get_recent_keys("10-Jun-2024", 7)
+    finally:
+        history.close()
+
+    assert sorted(imported) == sorted(get_plan_rows(distribution)[1])
+    assert ("2024-06-05", "HLT", "workout", "Gym") in imported
+    assert {task for _, task, _ in recent} == {"run", "read", "code", "draw", "workout"}
+    assert (TAG_IDS["HLT"], "workout", "App") not in recent
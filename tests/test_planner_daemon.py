@@ -0,0 +1,125 @@
+import json
+import os
+import stat
+import threading
+import urllib.error
+import urllib.request
+from http.server import HTTPServer
+
+import pytest
+
+import planner_daemon
+from conftest import FIXTURE_TASKS_DIR
+
+TOKEN = "test-token"
+
+def write_config(path, tasks_dir=FIXTURE_TASKS_DIR):
+    with open(path, 'w') as file:
+        json.dump({
+            "tasks-dir": tasks_dir,
+            "tag-distribution": {"daily-priorities": {
+                "#DEV": {"weekly-amount-days": [2, 4], "daily-amount": [1], "sorting-index": 0}}},
+        }, file)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    cfg_path = tmp_path / "cfg.json"
+    write_config(cfg_path)
+    (tmp_path / "plans").mkdir()
+    server = HTTPServer(("127.0.0.1", 0), planner_daemon.PlannerRequestHandler)
+    server.state = planner_daemon.PlannerState(str(cfg_path), use_cache=False, output_dir=str(tmp_path / "plans"))
+    server.token = TOKEN
+    server.verbose = False
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield cfg_path, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, data=None, token=TOKEN, content_type="application/json"):
+    body = None if data is None else json.dumps(data).encode('utf-8')
+    headers = {"Content-Type": content_type}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers), timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+@pytest.mark.parametrize("broken", ["{not json", '{"tasks-dir": "tasks"}', "missing-tasks-dir"])
+def test_failed_reload_keeps_serving(tmp_path, daemon, broken):
+    cfg_path, url = daemon
+    status, before = request(url + "/status")
+    assert status == 200
+
+    if broken == "missing-tasks-dir":
+        write_config(cfg_path, str(tmp_path / "no-such-dir"))
+    else:
+        cfg_path.write_text(broken)
+    status, response = request(url + "/reload", {})
+    assert status == 500
+    assert "Reload failed" in response["error"]
+
+    assert request(url + "/status") == (200, before)
+    status, plan = request(url + "/plan", {"start_date": "03-Jun-2024", "output": "plan.csv", "seed": 1,
+                                           "history": False})
+    assert status == 200
+    assert plan["files"] == [os.path.realpath(tmp_path / "plans" / "plan.csv")]
+
+
+def test_reload_picks_up_a_fixed_configuration(daemon):
+    cfg_path, url = daemon
+    cfg_path.write_text("{not json")
+    assert request(url + "/reload", {})[0] == 500
+    write_config(cfg_path)
+    assert request(url + "/reload", {})[0] == 200
+
+
+def plan_request(output, seed=1):
+    return {"start_date": "03-Jun-2024", "output": output, "seed": seed, "history": False}
+
+
+@pytest.mark.parametrize("token", [None, "wrong-token"])
+def test_requests_without_the_token_are_refused(tmp_path, daemon, token):
+    _, url = daemon
+    assert request(url + "/status", token=token)[0] == 401
+    assert request(url + "/plan", plan_request("plan.csv"), token=token)[0] == 401
+    assert request(url + "/reload", {}, token=token)[0] == 401
+    assert not (tmp_path / "plans" / "plan.csv").exists()
+
+
+def test_only_json_bodies_are_accepted(tmp_path, daemon):
+    # A web page can send text/plain to localhost without a preflight
+    _, url = daemon
+    assert request(url + "/plan", plan_request("plan.csv"), content_type="text/plain")[0] == 415
+    assert not (tmp_path / "plans" / "plan.csv").exists()
+
+
+@pytest.mark.parametrize("output", ["../outside.csv", "/tmp/week-organizer-outside.csv", "sub/../../outside.csv"])
+def test_outputs_outside_of_the_output_directory_are_refused(tmp_path, daemon, output):
+    _, url = daemon
+    status, response = request(url + "/plan", plan_request(output))
+    assert status == 403
+    assert "outside of the output directory" in response["error"]
+    assert not (tmp_path / "outside.csv").exists()
+    assert not os.path.exists("/tmp/week-organizer-outside.csv")
+
+
+@pytest.mark.parametrize("seed", ["1", 1.5, True, [1], 2**64])
+def test_seed_must_be_an_integer(daemon, seed):
+    _, url = daemon
+    status, response = request(url + "/plan", plan_request("plan.csv", seed))
+    assert status == 400
+    assert "seed" in response["error"]
+
+
+def test_token_file_is_private(tmp_path):
+    token_path = tmp_path / "cache" / "daemon.token"
+    token = planner_daemon.write_token(str(token_path))
+    assert token_path.read_text() == token
+    assert stat.S_IMODE(os.stat(token_path).st_mode) == 0o600
+    assert planner_daemon.write_token(str(token_path)) != token
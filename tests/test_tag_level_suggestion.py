@@ -0,0 +1,134 @@
+import contextlib
+import io
+import random
+
+import pytest
+
+import tag_level_suggestion
+import task_configuration
+from conftest import make_config
+
+
+def solve(config, target_load, seed):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        solution = tag_level_suggestion.solve_schedule(config, target_load, random.Random(seed))
+    return solution, output.getvalue()
+
+
+def check_schedule(config, weekly_schedule, tag_counts):
+    for tag in config.tag_ids:
+        daily_amounts = [day.count(tag) for day in weekly_schedule if tag in day]
+        assert config.weekly_min[tag] <= len(daily_amounts) <= config.weekly_max[tag]
+        assert all(config.daily_min[tag] <= amount <= config.daily_max[tag] for amount in daily_amounts)
+        assert sum(daily_amounts) == tag_counts[tag]
+        assert config.tag_ranges[tag][0] <= tag_counts[tag] <= config.tag_ranges[tag][1]
+    for day in weekly_schedule:
+        assert day == sorted(day, key=config.sorting_index.__getitem__)
+
+
+def test_feasible_targets_are_met_exactly(config):
+    min_load, max_load = tag_level_suggestion.get_load_range(config)
+    for target_load in range(min_load, max_load + 1):
+        for seed in range(5):
+            solution, _ = solve(config, target_load, seed)
+            assert solution is not None
+            weekly_schedule, tag_counts, tag_ranges = solution
+            assert sum(tag_counts) == target_load
+            assert sum(len(day) for day in weekly_schedule) == target_load
+            assert tag_ranges == config.tag_ranges
+            check_schedule(config, weekly_schedule, tag_counts)
+
+
+def test_infeasible_targets_are_reported(config):
+    min_load, max_load = tag_level_suggestion.get_load_range(config)
+    for target_load in (min_load - 1, max_load + 1):
+        solution, output = solve(config, target_load, 1)
+        assert solution is None
+        assert f"Target load {target_load} can't be met" in output
+        assert f"from {min_load} to {max_load}" in output
+
+
+def test_target_between_reachable_loads_is_reported():
+    # 7 days of 2 plus none or one day of 3: only 14 and 17 within the range
+    config = task_configuration.Configuration({"tasks-dir": "tasks", "tag-distribution": {"daily-priorities": {
+        "#HLT": {"weekly-amount-days": [7], "daily-amount": [2], "sorting-index": 0},
+        "#DEV": {"weekly-amount-days": [0, 1], "daily-amount": [3], "sorting-index": 1}}}})
+    assert tag_level_suggestion.get_load_range(config) == (14, 17)
+    for target_load in (14, 17):
+        assert sum(solve(config, target_load, 1)[0][1]) == target_load
+    for target_load in (15, 16):
+        solution, output = solve(config, target_load, 1)
+        assert solution is None
+        assert "can't be met" in output
+
+
+@pytest.mark.parametrize("value, expected", [("45", 45), (" 45 ", 45), ("0%", None), ("100%", None)])
+def test_parse_target_load(value, expected):
+    config = make_config()
+    min_load, max_load = tag_level_suggestion.get_load_range(config)
+    expected = {"0%": min_load, "100%": max_load}.get(value, expected)
+    assert tag_level_suggestion.parse_target_load(config, value) == expected
+
+
+@pytest.mark.parametrize("value", ["abc", "%", "4.5", "x%"])
+def test_parse_target_load_rejects_garbage(value):
+    with pytest.raises(ValueError):
+        tag_level_suggestion.parse_target_load(make_config(), value)
+
+
+def recount(config, weekly_schedule):
+    day_counts = [[day.count(tag) for tag in range(len(config.labels))] for day in weekly_schedule]
+    tag_counts = [sum(counts[tag] for counts in day_counts) for tag in range(len(config.labels))]
+    return day_counts, tag_counts
+
+
+def check_ranges(config, weekly_schedule, tag_counts):
+    for tag in config.tag_ids:
+        assert config.tag_ranges[tag][0] <= tag_counts[tag] <= config.tag_ranges[tag][1]
+        assert all(day.count(tag) <= config.daily_max[tag] for day in weekly_schedule)
+    for day in weekly_schedule:
+        assert day == sorted(day, key=config.sorting_index.__getitem__)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_adjust_schedule_keeps_the_counts(config, seed):
+    rng = random.Random(seed)
+    weekly_schedule, tag_counts, tag_ranges = tag_level_suggestion.generate_schedule(config, rng)
+    day_counts = tag_level_suggestion.build_day_counts(weekly_schedule, config)
+    # Up to the hardest week, down to the easiest one and back to the middle
+    with contextlib.redirect_stdout(io.StringIO()):
+        for easier, steps in ((False, 60), (True, 120), (False, 20)):
+            for _ in range(steps):
+                tag_level_suggestion.adjust_schedule(weekly_schedule, tag_counts, tag_ranges, config, easier, rng,
+                                                     day_counts)
+                assert (day_counts, tag_counts) == recount(config, weekly_schedule)
+                check_ranges(config, weekly_schedule, tag_counts)
+
+
+def run_commands(monkeypatch, config, commands, seed=1):
+    answers = iter(commands + ["c"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tag_level_suggestion.run_interactive_mode(False, False, config, random.Random(seed))
+
+
+def test_interactive_steps(monkeypatch, config):
+    _, tag_counts, _ = run_commands(monkeypatch, config, [])
+    start_load = sum(tag_counts)
+    min_load, max_load = (sum(config.tag_ranges[tag][i] for tag in config.tag_ids) for i in (0, 1))
+    assert min_load + 3 <= start_load <= max_load - 5
+
+    for commands, expected_load in ((["i 5"], start_load + 5), (["i", "i 2", "d 3"], start_load),
+                                    (["d 3"], start_load - 3)):
+        weekly_schedule, tag_counts, _ = run_commands(monkeypatch, config, commands)
+        assert sum(tag_counts) == expected_load
+        assert recount(config, weekly_schedule)[1] == tag_counts
+        check_ranges(config, weekly_schedule, tag_counts)
+
+    # 'i 1000' stops when nothing can be adjusted any more: one more step changes nothing
+    for command in ("i", "d"):
+        weekly_schedule, tag_counts, _ = run_commands(monkeypatch, config, [f"{command} 1000"])
+        assert recount(config, weekly_schedule)[1] == tag_counts
+        check_ranges(config, weekly_schedule, tag_counts)
+        assert sum(run_commands(monkeypatch, config, [f"{command} 1000", command])[1]) == sum(tag_counts)
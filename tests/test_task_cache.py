@@ -0,0 +1,45 @@
+import os
+
+import task_cache
+import task_loader
+from conftest import FIXTURE_TASKS_DIR
+
+
+def fields(task):
+    return (task.tag, task.task, task.description, task.priority, task.min_days, task.max_days, task.remarks,
+            task.prompt, task.file)
+
+
+def load(cache_path):
+    cache = task_cache.TaskCache(cache_path)
+    tasks, errors = task_loader.load_tasks_directory(FIXTURE_TASKS_DIR, cache=cache)
+    cache.save()
+    return cache, tasks, errors
+
+
+def test_cached_tasks_are_the_parsed_tasks(tmp_path, fixture_tasks):
+    cache_path = str(tmp_path / "cache" / "tasks.json")
+    cache, _, _ = load(cache_path)
+    assert cache.misses == len(task_loader.list_task_files(FIXTURE_TASKS_DIR))
+
+    cache, tasks, errors = load(cache_path)
+    assert cache.misses == 0 and cache.hits > 0
+    assert not errors
+    assert [fields(task) for task in tasks] == [fields(task) for task in fixture_tasks]
+    assert oct(os.stat(cache_path).st_mode & 0o777) == oct(0o600)
+
+
+def test_damaged_cache_is_ignored(tmp_path, fixture_tasks):
+    cache_path = tmp_path / "tasks.json"
+    for content in ["garbage", '{"version": 3, "entries": {"x": {"tasks": [[1]]}}}', "[]"]:
+        cache_path.write_text(content)
+        cache, tasks, _ = load(str(cache_path))
+        assert cache.hits == 0
+        assert [fields(task) for task in tasks] == [fields(task) for task in fixture_tasks]
+
+
+def test_default_cache_is_outside_the_tasks_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user-cache"))
+    path = task_cache.get_default_cache_path(FIXTURE_TASKS_DIR)
+    assert not os.path.abspath(path).startswith(os.path.abspath(FIXTURE_TASKS_DIR))
+    assert path != task_cache.get_default_cache_path(str(tmp_path))
@@ -0,0 +1,73 @@
+import copy
+import json
+
+import pytest
+
+import task_configuration
+from task_configuration import ConfigurationError
+
+BASE = {
+    "tasks-dir": "tasks",
+    "stash-dir": "stash",
+    "tag-distribution": {"daily-priorities": {
+        "#DEV": {"weekly-amount-days": [2, 4], "daily-amount": [1], "sorting-index": 0, "pick-up-priority": 0.6,
+                 "color": "#1155cc", "description": "Development"}}},
+    "permanent-tasks": {"1": ["organize-week,\"Move to done, summarize\",new,$DATE,TODO,,"]},
+}
+
+
+def make_data(**changes):
+    # changes: field path separated by "__" -> new value, None removes the field
+    data = copy.deepcopy(BASE)
+    for path, value in changes.items():
+        *parents, field = path.split("__")
+        target = data
+        for parent in parents:
+            target = target[parent]
+        if value is None:
+            target.pop(field, None)
+        else:
+            target[field] = value
+    return data
+
+
+def dev(**changes):
+    return {f"tag-distribution__daily-priorities__#DEV__{field.replace('_', '-')}": value
+            for field, value in changes.items()}
+
+
+def test_valid_configuration():
+    cfg = task_configuration.Configuration(make_data())
+    tag_id = cfg.tag_ids[0]
+    assert cfg.pickup_priority[tag_id] == 0.6
+    assert cfg.colors[tag_id] == "#1155cc"
+    assert cfg.stash_dir == "stash"
+    (fields, date_fields), = cfg.permanent_tasks[1]
+    assert fields == ("organize-week", "Move to done, summarize", "new", "$DATE", "TODO", "", "")
+    assert date_fields == (3,)
+
+
+@pytest.mark.parametrize("changes, message", [
+    (dev(pick_up_priority="high"), "pick-up-priority"),
+    (dev(pick_up_priority=[1]), "pick-up-priority"),
+    (dev(pick_up_priority=True), "pick-up-priority"),
+    (dev(pick_up_priority=-1), "pick-up-priority"),
+    (dev(color=255), "color"),
+    (dev(color=None) | dev(description=["x"]), "description"),
+    (dev(weekly_amount_days=[8]), "weekly-amount-days"),
+    (dev(weekly_amount_days=[2, 9]), "weekly-amount-days"),
+    ({"stash-dir": 1}, "stash-dir"),
+    ({"stash-dir": ["stash"]}, "stash-dir"),
+    ({"permanent-tasks": {"1": ["organize-week,\"Move to done,new,$DATE,TODO,,"]}}, "permanent-tasks.1"),
+    ({"permanent-tasks": {"2": ["workout,\"App\"x,new,$DATE,HLT,,"]}}, "permanent-tasks.2"),
+])
+def test_invalid_values_raise_configuration_error(changes, message):
+    with pytest.raises(ConfigurationError, match=message):
+        task_configuration.Configuration(make_data(**changes))
+
+
+def test_load_configuration_reports_the_file(tmp_path):
+    path = tmp_path / "cfg.json"
+    path.write_text(json.dumps(make_data(**dev(pick_up_priority="high"))))
+    with pytest.raises(ConfigurationError, match=str(path)):
+        task_configuration.load_configuration(str(path))
@@ -0,0 +1,92 @@
+import contextlib
+import io
+import sqlite3
+import threading
+
+import pytest
+
+import llm_stub_server
+import task_enrichment
+from llm_cache import LlmCache
+from task_loader import TAG_IDS, Task
+
+
+def make_distribution(prompts):
+    tasks = [Task(TAG_IDS["EDU"], f"task-{i}", "", 1.0, 1, 1, "", prompt, "edu.csv") for i, prompt in enumerate(prompts)]
+    return [{"date": "03-Jun-2024", "tags": [task.tag for task in tasks], "tasks": tasks}]
+
+
+def test_cache_is_not_locked_while_fetching(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "llm-cache.sqlite")
+    settings = task_enrichment.make_settings(cache_path=cache_path)
+    cache = LlmCache(cache_path)
+    params = task_enrichment.get_sampling_params(settings)
+    cache.put(cache.make_key(settings.model, task_enrichment.SYSTEM_MESSAGE, "cached", params), "cached answer")
+    cache.close()
+
+    async def fetch_answers(prompts, settings):
+        # Another planner writes to the same cache while this one waits for the API
+        other = sqlite3.connect(cache_path, timeout=0)
+        try:
+            other.execute("UPDATE responses SET used = 0")
+            other.commit()
+        finally:
+            other.close()
+        return {prompt: f"answer to {prompt}" for prompt in prompts}
+
+    monkeypatch.setattr(task_enrichment, "fetch_answers", fetch_answers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        answers = task_enrichment.enrich_distribution(make_distribution(["cached", "new"]), settings)
+    assert answers == {"cached": "cached answer", "new": "answer to new"}
+
+    cache = LlmCache(cache_path)
+    try:
+        assert cache.get(cache.make_key(settings.model, task_enrichment.SYSTEM_MESSAGE, "new", params)) == "answer to new"
+    finally:
+        cache.close()
+
+
+@pytest.fixture
+def stub_server():
+    pytest.importorskip("openai")
+    server = llm_stub_server.make_server(0, delay=0.05)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_enrichment_with_stub_server(tmp_path, stub_server):
+    server, base_url = stub_server
+    settings = task_enrichment.make_settings(base_url, concurrency=4, cache_path=str(tmp_path / "llm-cache.sqlite"))
+    prompts = [f"prompt {i}" for i in range(8)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        answers = task_enrichment.enrich_distribution(make_distribution(prompts + prompts[:2]), settings)
+    assert answers == {prompt: f"Stub answer to: {prompt}" for prompt in prompts}
+    assert server.requests == len(prompts)
+    assert 1 < server.max_active <= 4
+
+    # Everything is cached now
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert task_enrichment.enrich_distribution(make_distribution(prompts), settings) == answers
+    assert server.requests == len(prompts)
+
+
+def test_chatgpt_shares_the_cache_with_enrichment(tmp_path, stub_server):
+    chatgpt = pytest.importorskip("chatgpt")
+    server, base_url = stub_server
+    cache_path = str(tmp_path / "llm-cache.sqlite")
+    settings = task_enrichment.make_settings(base_url, cache_path=cache_path)
+    client = chatgpt.OpenAI(api_key=settings.api_key, base_url=base_url)
+    cache = LlmCache(cache_path)
+    try:
+        assert chatgpt.get_chatgpt_response("shared", client, settings, cache) == "Stub answer to: shared"
+    finally:
+        cache.close()
+    assert server.requests == 1
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        answers = task_enrichment.enrich_distribution(make_distribution(["shared"]), settings)
+    assert answers == {"shared": "Stub answer to: shared"}
+    assert server.requests == 1
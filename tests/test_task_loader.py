@@ -0,0 +1,80 @@
+import io
+import os
+
+import pytest
+
+import task_loader
+from task_loader import TAG_IDS
+
+LOADER_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "loader")
+
+
+def load(file_name):
+    return task_loader.load_tasks_file(os.path.join(LOADER_FIXTURES_DIR, file_name))
+
+
+def fields(task):
+    return (task.tag, task.task, task.description, task.priority, task.min_days, task.max_days, task.remarks,
+            task.prompt, task.file)
+
+
+def test_invalid_rows_are_reported_with_their_line():
+    tasks, errors = load("mixed.csv")
+    assert [fields(task) for task in tasks] == [
+        (TAG_IDS["DEV"], "ok-task", "fine", 0.5, 1, 2, "", "", "mixed.csv"),
+        (TAG_IDS["HLT"], "last", "semi;colon", 2.0, 3, 3, "remarks", "prompt", "mixed.csv"),
+    ]
+    # Line 3 is empty and skipped; the multi-line row is reported at its first line
+    assert [(error.file, error.row) for error in errors] == [("mixed.csv", row) for row in (4, 5, 6, 7, 8, 9, 10, 11)]
+    messages = [error.message for error in errors]
+    assert "'XXX' tag found" in messages[0]
+    assert "wrong value for the task" in messages[1]
+    assert messages[2] == "'1e3' has wrong value for pickup-priority"
+    assert messages[3] == "'-1' has wrong value for pickup-priority"
+    assert messages[4] == "'3-2' has wrong value for days"
+    assert messages[5] == "'0' has wrong value for days"
+    assert messages[6] == "Inconsistent number of columns. Expected 7 but got 6"
+    assert messages[7] == "'abc' has wrong value for pickup-priority"
+    assert task_loader.format_error(errors[0]) == f"Error: {messages[0]} at row 4. (File:mixed.csv)"
+
+
+def test_columns_are_found_by_name():
+    tasks, errors = load("reordered.csv")
+    assert not errors
+    assert [fields(task) for task in tasks] == [
+        (TAG_IDS["EDU"], "read", "a book", 1.5, 2, 2, "note", "ask", "reordered.csv")]
+
+
+def test_file_level_errors():
+    assert load("empty.csv") == ([], [task_loader.LoadError("empty.csv", 0, "File is empty")])
+    tasks, errors = load("missing-columns.csv")
+    assert tasks == []
+    assert errors == [task_loader.LoadError("missing-columns.csv", 1, "Missing columns prompt in header")]
+    assert task_loader.format_error(errors[0]).endswith("at row 1. (File:missing-columns.csv)")
+
+    tasks, errors = load("no-such-file.csv")
+    assert tasks == [] and errors[0].row == 0 and errors[0].message.startswith("Can't read CSV file")
+
+
+def test_load_tasks_directory_reads_the_csv_files_in_name_order():
+    tasks, errors = task_loader.load_tasks_directory(LOADER_FIXTURES_DIR)
+    assert [task.task for task in tasks] == ["ok-task", "last", "read"]
+    assert [error.file for error in errors] == ["empty.csv"] + ["missing-columns.csv"] + ["mixed.csv"] * 8
+
+
+def parse_priority(value):
+    tasks, errors = task_loader.parse_tasks(
+        io.StringIO(f"tag;task;description;pickup-priority;days;remarks;prompt\nDEV;t;d;{value};1;;\n"), "test.csv")
+    return tasks[0].priority if tasks else None
+
+
+@pytest.mark.parametrize("value, priority", [("1", 1.0), ("0", 0.0), ("0.25", 0.25), (".5", 0.5), ("3.", 3.0),
+                                             ("10", 10.0), ("007", 7.0)])
+def test_decimal_priorities_are_accepted(value, priority):
+    assert parse_priority(value) == priority
+
+
+@pytest.mark.parametrize("value", ["1e3", "-1", "+1", "abc", "", " 1", "inf", "nan", "1.2.3", "1_000", "0x10",
+                                   "²", "9" * 400])
+def test_other_priorities_are_rejected(value):
+    assert parse_priority(value) is None
@@ -0,0 +1,69 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from task_loader import TAG_IDS, Task
+from task_pool import TaskPool
+
+DEV = TAG_IDS["DEV"]
+
+
+def make_tasks(priorities, min_days=None):
+    min_days = min_days or [1] * len(priorities)
+    return [Task(DEV, f"task-{i}", "", priority, days, 3, "", "", "dev.csv")
+            for i, (priority, days) in enumerate(zip(priorities, min_days))]
+
+
+def assert_frequencies(counts, probabilities, draws):
+    # Every frequency within 5 standard deviations of its probability
+    for task, probability in probabilities.items():
+        sigma = math.sqrt(draws * probability * (1 - probability))
+        assert abs(counts[task] - draws * probability) <= 5 * sigma + 1, task.task
+
+
+def test_same_pick_as_random_choices():
+    # One bucket keeps the loading order, so a draw selects the same task as random.choices over the weights
+    tasks = make_tasks([0.25, 2.0, 0.5, 3.0, 1.0, 0.0, 1.5])
+    pool = TaskPool(tasks)
+    for seed in range(2000):
+        pool.reset()
+        expected = random.Random(seed).choices(tasks, [task.priority for task in tasks])[0]
+        assert pool.pick(DEV, 3, random.Random(seed)) is expected
+
+
+@pytest.mark.parametrize("max_slots", [1, 3])
+def test_pick_distribution_without_replacement(max_slots):
+    # Several buckets (min days 1 and 2): same distribution as random.choices over the tasks which fit
+    tasks = make_tasks([1.0, 3.0, 0.5, 2.0, 1.5], [1, 2, 1, 2, 1])
+    fitting = [task for task in tasks if task.min_days <= max_slots]
+    total = sum(task.priority for task in fitting)
+    first_probabilities = {task: task.priority / total for task in fitting}
+    second_probabilities = {task: sum(first_probabilities[other] * task.priority / (total - other.priority)
+                                      for other in fitting if other is not task) for task in fitting}
+
+    draws = 20000
+    rng = random.Random(1)
+    pool = TaskPool(tasks)
+    first, second = Counter(), Counter()
+    for _ in range(draws):
+        pool.reset()
+        first[pool.pick(DEV, max_slots, rng)] += 1
+        second[pool.pick(DEV, max_slots, rng)] += 1
+    assert set(first) == set(fitting)
+    assert_frequencies(first, first_probabilities, draws)
+    assert_frequencies(second, second_probabilities, draws)
+
+
+def test_pick_after_float_cancellation():
+    # Taking out the huge weight leaves no trace of 1.0 in the float sums of the tree
+    small, huge = make_tasks([1.0, 1e17])
+    pool = TaskPool([small, huge])
+    rng = random.Random(3)
+    assert pool.pick(DEV, 1, rng) is huge
+    assert pool.pick(DEV, 1, rng) is small
+    assert pool.pick(DEV, 1, rng) is None
+
+    pool.reset()
+    assert {pool.pick(DEV, 1, rng), pool.pick(DEV, 1, rng)} == {small, huge}
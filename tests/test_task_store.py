@@ -0,0 +1,105 @@
+import os
+import random
+
+import pytest
+
+import batch_planner
+import plan_history
+import task_loader
+import task_store
+from conftest import make_config
+from task_pool import TaskPool, get_task_key
+
+SEEDS = [1, 2, 3, 7, 42]
+
+
+def read_bytes(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+@pytest.fixture
+def store(tmp_path, fixture_tasks):
+    path = str(tmp_path / "tasks.sqlite")
+    task_store.import_tasks(fixture_tasks, path)
+    return path
+
+
+def generate(task_pool, cfg, output_file, seed, start_date="03-Jun-2024", weeks=1, history=None):
+    files = batch_planner.generate_plan(task_pool, cfg, start_date, str(output_file), seed, weeks=weeks,
+                                        history=history)
+    return [read_bytes(file) for file in files]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("weeks", [1, 3])
+def test_same_plan_as_csv_backend(tmp_path, config, fixture_tasks, store, seed, weeks):
+    csv_plan = generate(TaskPool(fixture_tasks), config, tmp_path / "csv.csv", seed, weeks=weeks)
+    sqlite_plan = generate(task_store.SqliteTaskPool(store), config, tmp_path / "sqlite.csv", seed, weeks=weeks)
+    assert csv_plan == sqlite_plan
+
+
+def test_same_plans_with_reused_pools(tmp_path, config, fixture_tasks, store):
+    # Batch workers plan several dates with one pool
+    csv_pool = TaskPool(fixture_tasks)
+    sqlite_pool = task_store.SqliteTaskPool(store)
+    for seed, start_date in zip(SEEDS, ["03-Jun-2024", "10-Jun-2024", "17-Jun-2024", "24-Jun-2024", "01-Jul-2024"]):
+        assert (generate(csv_pool, config, tmp_path / "csv.csv", seed, start_date)
+                == generate(sqlite_pool, config, tmp_path / "sqlite.csv", seed, start_date))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_same_plan_with_avoid_recent(tmp_path, fixture_tasks, store, seed):
+    cfg = make_config(stash_dir=str(tmp_path / "stash"))
+    generate(TaskPool(fixture_tasks), cfg, tmp_path / "previous.csv", seed,
+             history=plan_history.HistorySettings(True, 0, 0.0))
+    history = plan_history.HistorySettings(False, 7, 0.0)
+
+    csv_pool = TaskPool(fixture_tasks)
+    sqlite_pool = task_store.SqliteTaskPool(store)
+    csv_plan = generate(csv_pool, cfg, tmp_path / "csv.csv", seed, "10-Jun-2024", history=history)
+    sqlite_plan = generate(sqlite_pool, cfg, tmp_path / "sqlite.csv", seed, "10-Jun-2024", history=history)
+    assert csv_pool.scaled and len(csv_pool.scaled) == len(sqlite_pool.scaled)
+    assert csv_plan == sqlite_plan
+
+
+def test_same_picks_with_weight_factors(fixture_tasks, store):
+    factors = {get_task_key(task): 0.25 for task in fixture_tasks[::3]}
+    csv_pool = TaskPool(fixture_tasks)
+    sqlite_pool = task_store.SqliteTaskPool(store)
+    csv_pool.set_weight_factors(factors)
+    sqlite_pool.set_weight_factors(factors)
+    csv_rng, sqlite_rng = random.Random(5), random.Random(5)
+    for tag in sorted({task.tag for task in fixture_tasks}) * 3:
+        for max_slots in (1, 2, 4):
+            csv_task = csv_pool.pick(tag, max_slots, csv_rng)
+            sqlite_task = sqlite_pool.pick(tag, max_slots, sqlite_rng)
+            assert (csv_task and get_task_key(csv_task)) == (sqlite_task and get_task_key(sqlite_task))
+
+
+def test_buckets_are_loaded_on_demand(fixture_tasks, store):
+    pool = task_store.SqliteTaskPool(store)
+    tag = fixture_tasks[0].tag
+    assert pool.pick(tag, 1, random.Random(1)) is not None
+    loaded = [(bucket_tag, bucket.min_days) for bucket_tag, buckets in pool.buckets.items() for bucket in buckets
+              if bucket.tree is not None]
+    assert loaded == [(tag, 1)]
+
+
+def test_export_import_round_trip(tmp_path, fixture_tasks, store):
+    exported_dir = str(tmp_path / "exported")
+    files = task_store.export_tasks(store, exported_dir)
+    assert sorted(files) == sorted({task.file for task in fixture_tasks})
+
+    tasks, errors = task_loader.load_tasks_directory(exported_dir)
+    assert not errors
+    fields = lambda task: (task.tag, task.task, task.description, task.priority, task.min_days, task.max_days,
+                           task.remarks, task.prompt, task.file)
+    assert [fields(task) for task in tasks] == [fields(task) for task in fixture_tasks]
+
+    reimported = str(tmp_path / "reimported.sqlite")
+    task_store.import_tasks(tasks, reimported)
+    exported_again = str(tmp_path / "exported-again")
+    task_store.export_tasks(reimported, exported_again)
+    for file_name in files:
+        assert read_bytes(os.path.join(exported_dir, file_name)) == read_bytes(os.path.join(exported_again, file_name))
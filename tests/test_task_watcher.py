@@ -0,0 +1,58 @@
+import contextlib
+import io
+import os
+import random
+import shutil
+from collections import Counter
+
+import pytest
+
+import task_loader
+import task_watcher
+from conftest import FIXTURE_TASKS_DIR
+from task_level_suggestion import WeekDistribution
+from task_pool import TaskPool, get_task_key
+from test_week_distribution import START_DATE, make_schedule
+
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_reload_keeps_the_placed_tasks_taken(tmp_path, config, seed):
+    tasks_dir = str(tmp_path / "tasks")
+    shutil.copytree(FIXTURE_TASKS_DIR, tasks_dir)
+    watcher = task_watcher.PollingWatcher(tasks_dir)
+    tasks, _ = task_loader.load_tasks_directory(tasks_dir)
+    task_pool = TaskPool(tasks)
+    weekly_schedule, tag_counts = make_schedule(config, seed)
+    week_dist = WeekDistribution(config, weekly_schedule, START_DATE, False, random.Random(seed))
+    with contextlib.redirect_stdout(io.StringIO()):
+        week_dist.distribute_tasks(task_pool, tag_counts)
+        # Only the mtime changes, every record of the files is recreated
+        for file_name in task_loader.list_task_files(tasks_dir):
+            touch(os.path.join(tasks_dir, file_name))
+        task_watcher.reload_changed_files(watcher, task_pool, week_dist)
+
+        distribution = week_dist.get_distribution()
+        for task, slots in week_dist.task_slots.items():
+            assert task not in tasks and task in task_pool.taken
+            assert all(distribution[day_index]["tasks"][slot_index] is task for day_index, slot_index in slots)
+
+        for day_index, day in enumerate(distribution):
+            for slot_index in range(len(day["tasks"])):
+                week_dist.regenerate_slot(task_pool, day_index, slot_index)
+
+    records = {}
+    slots_used = Counter()
+    for day in distribution:
+        for task in day["tasks"]:
+            if task is not None:
+                records.setdefault(get_task_key(task), set()).add(id(task))
+                slots_used[get_task_key(task)] += 1
+    for key, task_records in records.items():
+        assert len(task_records) == 1
+        task = next(task for task in week_dist.task_slots if get_task_key(task) == key)
+        assert slots_used[key] <= task.max_days
@@ -0,0 +1,211 @@
+import contextlib
+import io
+import random
+from collections import Counter
+
+import pytest
+
+import seeding
+import tag_level_suggestion
+from task_level_suggestion import WeekDistribution
+from task_loader import TAG_IDS, Task
+from task_pool import TaskPool
+
+START_DATE = "03-Jun-2024"
+SEEDS = range(40)
+
+
+def make_task(tag, name, min_days, max_days, priority=1.0):
+    return Task(TAG_IDS[tag], name, "", priority, min_days, max_days, "", "", "test.csv")
+
+
+def make_schedule(config, seed, weeks=1):
+    tag_rng, _ = seeding.make_stage_rngs(seed)
+    schedules = [tag_level_suggestion.generate_schedule(config, tag_rng) for _ in range(weeks)]
+    weekly_schedule, tag_counts, _ = tag_level_suggestion.merge_schedules(schedules)
+    return weekly_schedule, tag_counts
+
+
+def distribute(config, weekly_schedule, tag_counts, tasks, seed=0):
+    week_dist = WeekDistribution(config, weekly_schedule, START_DATE, False, random.Random(seed))
+    with contextlib.redirect_stdout(io.StringIO()):
+        week_dist.distribute_tasks(TaskPool(tasks), tag_counts)
+    return week_dist.get_distribution()
+
+
+def scan_place_tasks(week_distribution, assigned_tasks):
+    # Step 4 as it was before the free slot queues: scan every day and slot for every task
+    for assigned_task, task_days in assigned_tasks:
+        for day in week_distribution:
+            for i, tag in enumerate(day["tags"]):
+                if assigned_task.tag == tag and task_days > 0 and day["tasks"][i] is None:
+                    day["tasks"][i] = assigned_task
+                    task_days -= 1
+                    if task_days == 0:
+                        break
+            if task_days == 0:
+                break
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("backlog_share", [1, 3])
+def test_place_tasks_matches_scan(config, fixture_tasks, seed, backlog_share):
+    # A reduced backlog leaves slots without tasks, so the queues run empty too
+    weekly_schedule, tag_counts = make_schedule(config, seed, weeks=1 + seed % 2)
+    week_dist = WeekDistribution(config, weekly_schedule, START_DATE, False, random.Random(seed))
+    with contextlib.redirect_stdout(io.StringIO()):
+        assigned_tasks, _ = week_dist._pick_tasks(TaskPool(fixture_tasks[::backlog_share]), tag_counts)
+
+    expected = [{"date": day["date"], "tags": list(day["tags"]), "tasks": [None] * len(day["tags"])}
+                for day in week_dist.week_distribution]
+    scan_place_tasks(expected, assigned_tasks)
+    week_dist._place_tasks(assigned_tasks)
+    assert week_dist.week_distribution == expected
+
+
+def test_extension_stops_at_max_days(config):
+    dev = TAG_IDS["DEV"]
+    weekly_schedule = [[dev] for _ in range(5)] + [[], []]
+    tag_counts = [0] * len(TAG_IDS)
+    tag_counts[dev] = 5
+    task = make_task("DEV", "only-task", 1, 3)
+
+    for seed in SEEDS:
+        distribution = distribute(config, weekly_schedule, tag_counts, [task], seed)
+        slots = [day_task for day in distribution for day_task in day["tasks"]]
+        assert slots.count(task) == 3
+        assert slots.count(None) == 2
+
+
+def test_extension_never_fills_other_tags(config):
+    dev, art = TAG_IDS["DEV"], TAG_IDS["ART"]
+    weekly_schedule = [[dev, art], [art], [dev], [art, dev], [art], [dev], [art]]
+    tag_counts = [0] * len(TAG_IDS)
+    tag_counts[dev] = 4
+    tag_counts[art] = 5
+    # No ART task fits at all, DEV has too few days for its slots
+    tasks = [make_task("DEV", "dev-a", 1, 2), make_task("ART", "art-long", 7, 7)]
+
+    for seed in SEEDS:
+        distribution = distribute(config, weekly_schedule, tag_counts, tasks, seed)
+        for day in distribution:
+            for tag, day_task in zip(day["tags"], day["tasks"]):
+                if tag == art:
+                    assert day_task is None
+                elif day_task is not None:
+                    assert day_task.tag == tag
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("weeks", [1, 2])
+def test_days_used_never_exceed_max_days(config, fixture_tasks, seed, weeks):
+    weekly_schedule, tag_counts = make_schedule(config, seed, weeks)
+    # The small backlogs run out of tasks, so most tags go through the extension pass
+    for tasks in (fixture_tasks, fixture_tasks[::2], fixture_tasks[::4]):
+        distribution = distribute(config, weekly_schedule, tag_counts, tasks, seed)
+        days_used = Counter(day_task for day in distribution for day_task in day["tasks"] if day_task is not None)
+        for day_task, count in days_used.items():
+            assert count <= day_task.max_days
+        for day in distribution:
+            for tag, day_task in zip(day["tags"], day["tasks"]):
+                assert day_task is None or day_task.tag == tag
+
+
+def test_regenerate_slot_keeps_the_task_without_replacement(config):
+    dev = TAG_IDS["DEV"]
+    weekly_schedule = [[dev], [dev], [], [], [], [], []]
+    tag_counts = [0] * len(TAG_IDS)
+    tag_counts[dev] = 2
+    task = make_task("DEV", "only-task", 2, 2)
+    task_pool = TaskPool([task])
+    week_dist = WeekDistribution(config, weekly_schedule, START_DATE, False, random.Random(1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        week_dist.distribute_tasks(task_pool, tag_counts)
+        assert week_dist.regenerate_slot(task_pool, 0, 0) == []
+
+    assert [day["tasks"] for day in week_dist.get_distribution()[:2]] == [[task], [task]]
+    assert week_dist.task_slots[task] == [(0, 0), (1, 0)]
+    # Still taken, so it can't be drawn twice
+    assert task_pool.pick(dev, 2, random.Random(1)) is None
+
+
+def test_regenerate_slot_puts_the_old_task_back(config):
+    dev = TAG_IDS["DEV"]
+    weekly_schedule = [[dev], [dev], [], [], [], [], []]
+    tag_counts = [0] * len(TAG_IDS)
+    tag_counts[dev] = 2
+    tasks = [make_task("DEV", "first", 2, 2), make_task("DEV", "second", 2, 2)]
+    task_pool = TaskPool(tasks)
+    week_dist = WeekDistribution(config, weekly_schedule, START_DATE, False, random.Random(1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        week_dist.distribute_tasks(task_pool, tag_counts)
+        old_task = week_dist.get_distribution()[0]["tasks"][0]
+        new_tasks = week_dist.regenerate_slot(task_pool, 0, 0)
+
+    assert len(new_tasks) == 1 and new_tasks[0] is not old_task
+    assert [day["tasks"] for day in week_dist.get_distribution()[:2]] == [new_tasks, new_tasks]
+    assert old_task not in week_dist.task_slots
+    assert task_pool.pick(dev, 2, random.Random(1)) is old_task
+
+
+def distribute_long_task(config, other_tasks, seed=1):
+    # A 3 day DEV task on all 3 DEV slots of the week, other_tasks are added to the pool afterwards
+    dev = TAG_IDS["DEV"]
+    weekly_schedule = [[dev], [dev], [dev], [], [], [], []]
+    tag_counts = [0] * len(TAG_IDS)
+    tag_counts[dev] = 3
+    long_task = make_task("DEV", "long", 3, 3)
+    task_pool = TaskPool([long_task])
+    week_dist = WeekDistribution(config, weekly_schedule, START_DATE, False, random.Random(seed))
+    with contextlib.redirect_stdout(io.StringIO()):
+        week_dist.distribute_tasks(task_pool, tag_counts)
+    task_pool.add_tasks(other_tasks)
+    assert week_dist.task_slots == {long_task: [(0, 0), (1, 0), (2, 0)]}
+    return week_dist, task_pool, long_task
+
+
+def week_tasks(week_dist):
+    return [day["tasks"][0] for day in week_dist.get_distribution()[:3]]
+
+
+def test_regenerate_one_day_of_a_task(config):
+    short = make_task("DEV", "short", 1, 1)
+    week_dist, task_pool, long_task = distribute_long_task(config, [short])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert week_dist.regenerate_slot(task_pool, 1, 0, all_days=False) == [short]
+    assert week_tasks(week_dist) == [long_task, short, long_task]
+    assert week_dist.task_slots == {long_task: [(0, 0), (2, 0)], short: [(1, 0)]}
+    # The old task is still in the week, so it stays taken
+    assert task_pool.pick(TAG_IDS["DEV"], 3, random.Random(1)) is None
+
+
+def test_regenerate_one_day_without_replacement(config):
+    week_dist, task_pool, long_task = distribute_long_task(config, [])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert week_dist.regenerate_slot(task_pool, 1, 0, all_days=False) == []
+    assert week_tasks(week_dist) == [long_task] * 3
+    assert week_dist.task_slots == {long_task: [(0, 0), (1, 0), (2, 0)]}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_regenerate_extends_the_new_tasks(config, seed):
+    # 'medium' is drawn for 1-3 days and extended to all 3 slots, the old task goes back to the pool
+    medium = make_task("DEV", "medium", 1, 3)
+    week_dist, task_pool, long_task = distribute_long_task(config, [medium], seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert week_dist.regenerate_slot(task_pool, 0, 0) == [medium]
+    assert week_tasks(week_dist) == [medium] * 3
+    assert week_dist.task_slots == {medium: [(0, 0), (1, 0), (2, 0)]}
+    assert task_pool.pick(TAG_IDS["DEV"], 3, random.Random(1)) is long_task
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_regenerate_keeps_the_old_task_in_the_slots_left(config, seed):
+    # 'short' can take 2 of the 3 days at most, the old task keeps the last one and stays taken
+    short = make_task("DEV", "short", 1, 2)
+    week_dist, task_pool, long_task = distribute_long_task(config, [short], seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert week_dist.regenerate_slot(task_pool, 1, 0) == [short]
+    assert week_tasks(week_dist) == [short, short, long_task]
+    assert week_dist.task_slots == {short: [(0, 0), (1, 0)], long_task: [(2, 0)]}
+    assert task_pool.pick(TAG_IDS["DEV"], 3, random.Random(1)) is None
@@ -1,114 +1,66 @@
 import argparse
 import sys
 import os
-import csv
-import json
 from datetime import datetime
-from colorama import Fore, Style, init
 import tag_level_suggestion
 import task_level_suggestion
+import task_loader
+import task_cache
+import task_configuration
+import task_enrichment
+import task_watcher
+import batch_planner
+import plan_history
+import seeding
+import instrumentation
 
 def load_configuration(file_path):
+    # Compiled and validated configuration (task_configuration.Configuration) shared by all the stages
     try:
-        with open(file_path, 'r') as file:
-            return json.load(file)
+        return task_configuration.load_configuration(file_path)
     except FileNotFoundError:
         print(f"Error: The file {file_path} does not exist.")
         sys.exit(1)
+    except task_configuration.ConfigurationError as e:
+        printError(f"Error: {e}")
+        sys.exit(1)
 
 
 def printError(error_message):
-    print(f"{Fore.RED}{error_message}{Style.RESET_ALL}")
-available_tags = ['TODO','SKL','HLT','ART','DEV','EDU','LNG','PRJ','ENT']        
-def is_valid_csv_file(file_path):
-    try:
-        # Attempt to open the file and read the first few lines to validate its structure
-        with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
-            csvreader = csv.reader(csvfile, delimiter=';')
-            headers = next(csvreader)
-            
-            # Check for consistent number of columns and empty rows
-            for row_number, row in enumerate(csvreader, start=2):
-            
-                if len(row) != len(headers):
-                    printError(f"Error: Inconsistent number of columns at row {row_number}. Expected {len(headers)} but got {len(row)}. (File:{file_path})")
-                    return False  
-                    
-                # check tag value    
-                if not row[0] in available_tags:
-                    printError(f"Error: {row[0]} tag found which is not allowed literal. (File:{file_path})");
-                
-                # check task value 
-                if not (row[1] and isinstance(row[0], str)):
-                    printError(f"Error: '{row[1]}' has wrong value for the task at row {row_number}. (File:{file_path})");
-                    
-                # check pickup-priority 
-                if not (row[3] and row[3].replace('.', '', 1).isdigit() and float(row[3]) >= 0):
-                    printError(f"Error: '{row[3]}' has wrong value for pickup-priority at row {row_number}. (File:{file_path})");
-                    
-                # check days
-                if not row[4]:
-                    printError(f"Error: '{row[4]}' has wrong value for days at row {row_number}. (File:{file_path})");
-                    
-                    
-            
-            # Add additional validation logic if needed
-            return True
-    except Exception as e:
-        printError(f"Error reading CSV file {file_path}: {e}")
-        return False
-        
-def load_csv_files_from_directory(tasks_dir, verbose):
+    print(f"{tag_level_suggestion.get_color('#800000')}{error_message}{tag_level_suggestion.RESET_COLOR}")
+
+
+def load_csv_files_from_directory(tasks_dir, verbose, use_cache=False, rebuild_cache=False, jobs=1):
     # Inform about the directory being processed
     if verbose:
         print(f"Loading CSV files from directory: {tasks_dir}")
 
-    all_data = []
-    
     # Check if the directory exists
     if not os.path.exists(tasks_dir):
         print(f"Error: Directory {tasks_dir} does not exist.")
-        return all_data
-
-    # Iterate over each file in the directory
-    for file_name in os.listdir(tasks_dir):
-        if file_name.endswith('.csv'):
-            file_path = os.path.join(tasks_dir, file_name)
-            if verbose:
-                print(f"Loading file: {file_path}")
-                
-            # Check if the CSV file is valid
-            if not is_valid_csv_file(file_path):
-                continue
-            
-            # Read the CSV file
-            with open(file_path, mode='r', newline='', encoding='utf-8') as csvfile:
-                csvreader = csv.DictReader(csvfile, delimiter=';')
-                
-                for row in csvreader:
-                    row['file'] = file_name                    
-                    
-                    if not 'tag' in row:
-                        print(f"Error: 'tag' key not found in row of file {file_name}: {row}")
-                    if not 'task' in row:
-                        print(f"Error: 'task' key not found in row of file {file_name}: {row}")
-                    if not 'description' in row:
-                        print(f"Error: 'description' key not found in row of file {file_name}: {row}")
-                    if not 'pickup-priority' in row:
-                        print(f"Error: 'pickup-priority' key not found in row of file {file_name}: {row}")
-                    if not 'days' in row:
-                        print(f"Error: 'days' key not found in row of file {file_name}: {row}")                        
-                    if not 'remarks' in row:
-                        print(f"Error: 'remarks' key not found in row of file {file_name}: {row}")      
-                    if not 'prompt' in row:
-                        print(f"Error: 'prompt' key not found in row of file {file_name}: {row}")    
-                    
-                    all_data.append(row)
-    
+        return []
+
+    cache = None
+    if use_cache:
+        cache = task_cache.TaskCache(task_cache.get_default_cache_path(tasks_dir), rebuild=rebuild_cache)
+
+    with instrumentation.stage("load"):
+        all_data, errors = task_loader.load_tasks_directory(tasks_dir, verbose, cache, jobs)
+    for error in errors:
+        printError(task_loader.format_error(error))
+
+    if cache is not None:
+        cache.save()
+        instrumentation.count("cache-hits", cache.hits)
+        instrumentation.count("cache-misses", cache.misses)
+        if verbose:
+            print(cache.get_stats_line())
+
     if verbose:
         print(f"Total lines loaded: {len(all_data)}")
     return all_data
 
+
 def print_db(data):
     MAX_VAL_LEN = 24
     if not data:
@@ -118,11 +70,66 @@ def print_db(data):
     # Print each data row
     for row in data:
         # Shorten any value that exceeds MAX_VAL_LEN
-        shortened_row = {k: (v if v is None or len(v) <= MAX_VAL_LEN else v[:MAX_VAL_LEN-3] + "...") for k, v in row.items()}
+        values = {field: getattr(row, field) for field in row.__slots__}
+        values['tag'] = row.tag_name
+        shortened_row = {k: (v if not isinstance(v, str) or len(v) <= MAX_VAL_LEN else v[:MAX_VAL_LEN-3] + "...") for k, v in values.items()}
         print(shortened_row)
 
         
         
+def run_batch_mode(args):
+    cfg_paths = [item for item in args.batch if item.lower().endswith('.json')]
+    start_dates = [item for item in args.batch if not item.lower().endswith('.json')]
+    for start_date in start_dates:
+        try:
+            datetime.strptime(start_date, "%d-%b-%Y")
+        except ValueError:
+            printError(f"Error: '{start_date}' is neither a DD-MMM-YYYY date nor a configuration file.")
+            sys.exit(1)
+    if not cfg_paths:
+        cfg_paths = [args.cfg or "task-configuration.json"]
+    if not start_dates:
+        start_dates = [args.start_date or datetime.now().strftime("%d-%b-%Y")]
+    output_dir = args.output or "."
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Every tasks directory is loaded once and shared by all the plans using it
+    task_dbs = {}
+    plans = []
+    for cfg_path in cfg_paths:
+        cfg = load_configuration(cfg_path)
+        if args.tasks_db:
+            task_dbs[cfg.tasks_dir] = get_task_store(args.tasks_db)
+        elif cfg.tasks_dir not in task_dbs:
+            task_dbs[cfg.tasks_dir] = load_csv_files_from_directory(cfg.tasks_dir, args.verbose, not args.no_cache, args.rebuild_cache, max(1, args.jobs))
+        for start_date in start_dates:
+            output_file = batch_planner.get_batch_output_file(output_dir, cfg_path, start_date, len(cfg_paths) > 1)
+            plans.append((cfg, start_date, output_file))
+
+    batch_planner.run_batch(plans, task_dbs, max(1, args.jobs), args.seed, args.verbose, args.weeks, args.split_weeks,
+                            get_enrichment_settings(args), get_history_settings(args))
+
+
+def get_task_store(path):
+    if not os.path.exists(path):
+        printError(f"Error: Task store {path} does not exist. Create it with: python task_store.py import {path}")
+        sys.exit(1)
+    return path
+
+
+def get_history_settings(args):
+    return plan_history.HistorySettings(not args.no_history, args.avoid_recent, args.recent_weight)
+
+
+def get_enrichment_settings(args):
+    if not args.enrich:
+        return None
+    return task_enrichment.make_settings(args.llm_base_url, args.llm_api_key_file, args.llm_model, args.llm_concurrency,
+                                         args.llm_timeout, args.llm_retries,
+                                         cache_path=None if args.no_llm_cache else args.llm_cache,
+                                         cache_ttl=args.llm_cache_ttl * 24 * 3600, cache_size=args.llm_cache_size)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Organizer week plan suggestion utility",
@@ -150,15 +157,194 @@ def main():
         help='Path to the task configuration JSON file. Defaults to "task-configuration.json" if not specified'
     )
 
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Parse every task CSV file instead of using the parsed task cache'
+    )
+    parser.add_argument(
+        '--rebuild-cache',
+        action='store_true',
+        help='Ignore the parsed task cache, parse every task CSV file and write the cache again'
+    )
+    parser.add_argument(
+        '--tasks-db',
+        help='Plan from this SQLite task store (see task_store.py) instead of the tasks-dir CSV files'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Number of worker threads used to load the task CSV files (and worker processes used by --batch). Defaults to 1'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Watch the tasks directory and reload the added, modified and deleted task CSV files before every '
+             'command of the task level stage, without restarting'
+    )
+    parser.add_argument(
+        '--avoid-recent',
+        type=int,
+        default=0,
+        metavar='DAYS',
+        help='Avoid the tasks planned or done in the DAYS days before the start date (plan history of the stash-dir). '
+             'Disabled by default'
+    )
+    parser.add_argument(
+        '--recent-weight',
+        type=float,
+        default=0.0,
+        help='Multiplier of the pickup-priority of the tasks avoided by --avoid-recent. Defaults to 0 (not picked)'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='Don\'t record the saved plans in the plan history of the stash-dir'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='Seed of the random generators. A random seed is used if not specified, it is written to the output CSV footer'
+    )
+    parser.add_argument(
+        '--target-load',
+        type=str,
+        help='Build the tag level week with this total load (e.g. 45) or difficulty level (e.g. 60%%) instead of a random one'
+    )
+    parser.add_argument(
+        '--best-of',
+        type=int,
+        help='Start the tag level stage with the best of this many random weeks (requires numpy)'
+    )
+    parser.add_argument(
+        '--weeks',
+        type=int,
+        default=1,
+        help='Number of weeks to plan in one run. Tag quotas apply per week, picked tasks are not repeated over the '
+             'weeks. Defaults to 1'
+    )
+    parser.add_argument(
+        '--split-weeks',
+        action='store_true',
+        help='Save every week of a multi-week plan to its own CSV file (OUTPUT-week-N.csv) instead of one file'
+    )
+    parser.add_argument(
+        '--enrich',
+        action='store_true',
+        help='Answer the prompts of the picked tasks with a chat completions API and write the answers to the remarks '
+             '(requires the openai package)'
+    )
+    parser.add_argument(
+        '--llm-base-url',
+        help='Base URL of an OpenAI compatible API, e.g. http://127.0.0.1:8766/v1 for llm_stub_server.py. '
+             'Defaults to the OpenAI API'
+    )
+    parser.add_argument(
+        '--llm-model',
+        default=task_enrichment.DEFAULT_MODEL,
+        help=f'Model used by --enrich. Defaults to "{task_enrichment.DEFAULT_MODEL}"'
+    )
+    parser.add_argument(
+        '--llm-api-key-file',
+        help='File with the API key used by --enrich. OPENAI_API_KEY is used if not specified'
+    )
+    parser.add_argument(
+        '--llm-concurrency',
+        type=int,
+        default=8,
+        help='Maximum number of prompts sent at the same time by --enrich. Defaults to 8'
+    )
+    parser.add_argument(
+        '--llm-timeout',
+        type=float,
+        default=30.0,
+        help='Timeout of one request in seconds. Defaults to 30'
+    )
+    parser.add_argument(
+        '--llm-retries',
+        type=int,
+        default=2,
+        help='Number of retries of a failed request. Defaults to 2'
+    )
+    parser.add_argument(
+        '--llm-cache',
+        default=task_enrichment.DEFAULT_CACHE_PATH,
+        help=f'SQLite file keeping the answers of --enrich, only new prompts are sent. Defaults to "{task_enrichment.DEFAULT_CACHE_PATH}"'
+    )
+    parser.add_argument(
+        '--no-llm-cache',
+        action='store_true',
+        help='Send every prompt of --enrich instead of using the answer cache'
+    )
+    parser.add_argument(
+        '--llm-cache-ttl',
+        type=float,
+        default=30,
+        help='Days a cached answer is used for. Defaults to 30'
+    )
+    parser.add_argument(
+        '--llm-cache-size',
+        type=int,
+        default=10000,
+        help='Maximum number of cached answers, the least recently used ones are evicted. Defaults to 10000'
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profile.json',
+        metavar='REPORT',
+        help='Record wall time per stage and counters (picks, failed picks, extensions, ...) and save them as JSON. '
+             'Defaults to "profile.json"'
+    )
+    parser.add_argument(
+        '--profile-stage',
+        help='Run this stage under cProfile and dump the stats to STAGE.prof (with --profile). Stages: load, '
+             'tag-generation, tag-adjustment, tag-solving, tag-sampling, task-distribution, task-picking, '
+             'task-placement, task-extension, task-regeneration, task-reload, history-lookup, csv-writing'
+    )
+    parser.add_argument(
+        '--batch',
+        nargs='+',
+        metavar='DATE_OR_CFG',
+        help='Generate plans without prompts for every combination of the given start dates (DD-MMM-YYYY) and '
+             'configuration files (*.json). --start-date and --cfg are used if no date or configuration is given. '
+             '--output is the output directory in this mode'
+    )
+
     args = parser.parse_args()
 
+    if args.weeks < 1:
+        printError("Error: --weeks must be at least 1.")
+        sys.exit(1)
+    if args.avoid_recent < 0 or args.recent_weight < 0:
+        printError("Error: --avoid-recent and --recent-weight can't be negative.")
+        sys.exit(1)
+    if args.best_of is not None and args.best_of < 1:
+        printError("Error: --best-of must be at least 1.")
+        sys.exit(1)
+    if args.seed is None:
+        args.seed = seeding.new_seed()
+
+    if args.profile:
+        instrumentation.enable(args.profile_stage)
+    try:
+        if args.batch is not None:
+            run_batch_mode(args)
+        else:
+            run_interactive_planning(args)
+    finally:
+        instrumentation.write_report(args.profile)
+
+
+def run_interactive_planning(args):
     # Use current date if --start-date is not specified
     if args.start_date is None:
         args.start_date = datetime.now().strftime("%d-%b-%Y")
     
     # Use default output file name if not specified
     if args.output is None:
-        args.output = f"{args.start_date}-week-plan.csv"
+        args.output = f"{args.start_date}-week-plan.csv" if args.weeks == 1 else f"{args.start_date}-{args.weeks}-weeks-plan.csv"
         
     # Use default cfg file name if not specified
     if args.cfg is None:
@@ -168,15 +354,41 @@ def main():
 
     if args.verbose:
         print('Generating a week suggestions...')
-        print(f"tasks-dir: {cfg['tasks-dir']}")
+        print(f"tasks-dir: {cfg.tasks_dir}")
         print(f'Start date: {args.start_date}')
         print(f'Output file: {args.output}')
+        print(f'Seed: {args.seed}')
     
-    tasks_db = load_csv_files_from_directory(cfg["tasks-dir"], args.verbose)
+    watcher = None
+    if args.tasks_db:
+        # The tasks are read from the store while planning
+        tasks_db = get_task_store(args.tasks_db)
+        if args.watch:
+            print("--watch watches the tasks-dir CSV files, it is ignored with --tasks-db")
+    else:
+        if args.watch and os.path.isdir(cfg.tasks_dir):
+            watcher = task_watcher.make_watcher(cfg.tasks_dir)
+            if args.verbose:
+                print(f"Watching {cfg.tasks_dir} ({type(watcher).__name__})")
+        tasks_db = load_csv_files_from_directory(cfg.tasks_dir, args.verbose, not args.no_cache, args.rebuild_cache, max(1, args.jobs))
     #if args.verbose:
     #    print_db(tasks_db)
         
-    weekly_schedule, tag_counts, tag_ranges = tag_level_suggestion.run_interactive_mode(False, args.verbose, cfg["tag-distribution"]["daily-priorities"])
+    target_load = None
+    if args.target_load:
+        try:
+            target_load = tag_level_suggestion.parse_target_load(cfg, args.target_load)
+        except ValueError:
+            printError(f"Error: '{args.target_load}' is not a valid target load.")
+            sys.exit(1)
+
+    tag_rng, task_rng = seeding.make_stage_rngs(args.seed)
+    schedules = []
+    for week in range(args.weeks):
+        if args.weeks > 1:
+            print(f"Week {week + 1} of {args.weeks}")
+        schedules.append(tag_level_suggestion.run_interactive_mode(False, args.verbose, cfg, tag_rng, target_load, args.best_of))
+    weekly_schedule, tag_counts, tag_ranges = tag_level_suggestion.merge_schedules(schedules)
     
     task_level_suggestion.run_interactive_mode(
         args.verbose, 
@@ -185,9 +397,16 @@ def main():
         tag_ranges, 
         tasks_db, 
         args.start_date, 
-        cfg["tag-distribution"]["daily-priorities"], 
-        cfg["permanent-tasks"], 
-        args.output) 
+        cfg, 
+        args.output,
+        task_rng,
+        args.seed,
+        args.split_weeks,
+        get_enrichment_settings(args),
+        watcher,
+        get_history_settings(args))
+    if watcher is not None:
+        watcher.close()
      
 
 if __name__ == "__main__":